@@ -0,0 +1,59 @@
+import importlib
+
+# Public names and the module they live in. Modules are only imported when one
+# of their names is first used, so the manifest and check commands do not pay
+# for pandas, numpy and openpyxl.
+_exports = {
+    "AutoBudget": "budget",
+    "FORMULA_MODES": "budget",
+    "BudgetStore": "store",
+    "RunningTotals": "totals",
+    "SummaryGrid": "grid",
+    "BudgetService": "service",
+    "SummaryWatcher": "watch",
+    "Projection": "projection",
+    "PROJECTION_METHODS": "projection",
+    "accumulate": "projection",
+    "fill_missing": "projection",
+    "RollupTree": "rollup",
+    "NODE_SEPARATOR": "rollup",
+    "node_path": "rollup",
+    "PlannedCell": "planned",
+    "PlannedSheet": "planned",
+    "Style": "style",
+    "CellStyle": "style",
+    "RunStats": "stats",
+    "ParseCache": "parse",
+    "parse_report": "parse",
+    "timed_parse_report": "parse",
+    "MANIFEST_NAME": "manifest",
+    "read_manifest_entry": "manifest",
+    "make_manifest": "manifest",
+    "check_manifest": "manifest",
+    "PARSER_VERSION": "reports",
+    "find_markers": "reports",
+    "open_cost_report": "reports",
+    "read_report_info": "reports",
+    "layout_cache": "reports",
+    "ENGINES": "reports",
+    "ReportSheet": "reports",
+    "available_engines": "reports",
+    "is_cost_report": "reports",
+    "add_cached_values": "xlsx",
+    "EXPORT_FORMATS": "export",
+    "budget_table": "export",
+    "export_budgets": "export",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_exports[name]}", __name__)
+    return getattr(module, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
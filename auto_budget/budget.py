@@ -0,0 +1,1180 @@
+import os
+import openpyxl
+from openpyxl.descriptors.base import String
+from openpyxl.styles import Border
+from openpyxl.utils import get_column_letter
+import numpy as np
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from .grid import SummaryGrid
+from .manifest import check_manifest, make_manifest
+from .parse import bounded_map, open_parse_cache, parse_report, timed_parse_report
+from .planned import PlannedSheet
+from .projection import Projection
+from .reports import is_cost_report
+from .rollup import NODE_SEPARATOR, RollupTree
+from .stats import RunStats
+from .store import BudgetStore
+from .totals import RunningTotals
+from .xlsx import add_cached_values
+from .style import CellStyle, Style
+
+FORMULA_MODES = ("formulas", "values", "hybrid")
+EXCEL_MAX_COLUMNS = 16384
+
+# Labels of the rows below the cost types, see make_sum_rows
+SUM_ROW_LABELS = ("Cost", "Budget", "Cost (ACC)", "Budget (ACC)", "Diff", "Diff (ACC)")
+
+
+class AutoBudget:
+    def __init__(
+        self,
+        input_dir_path,
+        workers=1,
+        use_cache=False,
+        cache_dir=None,
+        manifest_path=None,
+        decimal=None,
+        preflight=False,
+        known_cost_centers=None,
+        write_only=False,
+        summary_path=None,
+        stats=None,
+        streaming=False,
+        formula_mode="formulas",
+        budgets=None,
+        cost_centers=None,
+    ) -> None:
+        # Init
+        self.month_header = [
+            "Jan",
+            "Feb",
+            "Mar",
+            "Apr",
+            "May",
+            "Jun",
+            "Jul",
+            "Aug",
+            "Sep",
+            "Oct",
+            "Nov",
+            "Dec",
+        ]
+        self.column_standard_header = ["Month", "Budget", "Diff"]
+        self.offset = 2  # Offset from 0 where table begins
+        self.year = ""
+        self.cost_types = {}
+        self.cell_fonts = {}  # (row, col): (font, style) given to write_to_cell
+        self.column_widths = {}  # Longest value written to every column
+
+        # formulas: Excel works out Diff, Sum and the sum rows when the file is
+        # opened. values: the numbers are written instead. hybrid: formulas
+        # with their values cached in the file, added by save.
+        if formula_mode not in FORMULA_MODES:
+            raise Exception(
+                f"formula_mode is {formula_mode}, it should be one of {', '.join(FORMULA_MODES)}"
+            )
+        self.formula_mode = formula_mode
+        self.cached_values = {}  # (row, col): value of the formula, for hybrid
+
+        # Run statistics, a RunStats started here so loading is measured too
+        self.stats = None
+        if stats is not None:
+            self.enable_stats(stats)
+
+        self.cost_center_list = []
+        self.manifest = None
+        if preflight:
+            with self.stage("preflight"):
+                self.manifest = self.check_reports(
+                    input_dir_path, workers, known_cost_centers, manifest_path
+                )
+
+        # Add to an earlier summary, only the months it is missing are loaded
+        self.summary = None
+        periods = None
+        if summary_path is not None:
+            self.write_only = False
+            with self.stage("read_summary"):
+                self.workbook = openpyxl.load_workbook(summary_path)
+                self.summary = self.read_summary(self.workbook["Summary Sheet"])
+            if self.manifest is None:
+                with self.stage("preflight"):
+                    self.manifest = make_manifest(
+                        input_dir_path, workers, manifest_path
+                    )
+            periods = {
+                entry["cost_date"]
+                for entry in self.manifest["files"].values()
+                if int(entry["cost_date"][:3]) not in self.summary["months"]
+            }
+        else:
+            self.write_only = write_only  # Plan the summary, then stream it out
+            self.workbook = openpyxl.Workbook(write_only=write_only)  # Create workbook
+
+        # Streaming folds every report into RunningTotals as it is parsed,
+        # instead of keeping them all in a BudgetStore
+        self.streaming = streaming
+        if budgets is not None:
+            # Reports loaded before, by a batch run, input_dir_path is not read
+            self.budgets = budgets
+            self.cost_center_list = sorted(budgets.cost_centers)
+        else:
+            with self.stage("load"):
+                self.budgets = self.load_budgets(
+                    input_dir_path,
+                    workers,
+                    use_cache,
+                    self.manifest,
+                    periods,
+                    cache_dir,
+                    decimal,
+                )
+        self.periods = set(self.budgets.periods)  # Months with data in the summary
+        if cost_centers is not None:
+            # Only these get a column, the others still count in the month totals
+            self.cost_center_list = list(cost_centers)
+        if self.stats is not None:
+            self.stats.count("cost_rows", self.budgets.n_rows)
+
+    # ------------------------------------------------------------------------------------------------------------
+    #           Run statistics
+    # ------------------------------------------------------------------------------------------------------------
+
+    # Start measuring the rest of the run, see RunStats for what is measured
+    def enable_stats(self, stats=None) -> RunStats:
+        self.stats = stats if stats is not None else RunStats()
+        self.stats.start()
+        return self.stats
+
+    # Stop measuring and return the report, also written if stats has a report_path
+    def disable_stats(self) -> dict:
+        if self.stats is None:
+            return {}
+        report = self.stats.finish()
+        self.stats = None
+        return report
+
+    def stage(self, name):
+        if self.stats is None:
+            return nullcontext()
+        return self.stats.stage(name)
+
+    # Save the workbook and finish the run statistics. The workbook is written
+    # next to output_path and then moved over it, so it is never seen half
+    # written, also not the shards and summaries of groups.
+    def save(self, output_path) -> None:
+        partial_path = output_path + ".partial"
+        with self.stage("save"):
+            try:
+                self.workbook.save(partial_path)
+                if self.formula_mode == "hybrid":
+                    add_cached_values(
+                        partial_path,
+                        self.workbook.sheetnames.index("Summary Sheet"),
+                        self.cached_values,
+                    )
+                os.replace(partial_path, output_path)
+            except BaseException:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                raise
+        self.disable_stats()
+
+    # Close the write-only sheets of a workbook that will not be saved, left
+    # open they fail with errors when they are collected
+    def discard(self) -> None:
+        if self.write_only:
+            for sheet in self.workbook.worksheets:
+                if not sheet.closed:
+                    sheet.close()
+
+    # Write every loaded cost to output_dir as a dataset partitioned by year,
+    # see export_budgets. Needs the reports themselves, so not when streaming,
+    # and all of them, so not when updating a summary.
+    def export(self, output_dir, file_format="parquet") -> list:
+        if self.streaming:
+            raise Exception(
+                "exporting needs every report, it does not work with streaming"
+            )
+        if self.summary is not None:
+            raise Exception(
+                "exporting needs every report, it does not work when updating a summary"
+            )
+        # pyarrow is only imported when exporting, it is an optional extra
+        from .export import export_budgets
+
+        with self.stage("export"):
+            return export_budgets(self.budgets, output_dir, file_format)
+
+    # Save a summary of every group of cost centers to output_dir, as
+    # "<group>.xlsx", and one of all cost centers as "<all_name>.xlsx". The
+    # reports are loaded once, the summaries are made in parallel by worker
+    # processes with the options of this run. Returns group: path.
+    def save_groups(self, groups, output_dir, workers=1, all_name="All") -> dict:
+        if self.streaming or self.summary is not None:
+            raise Exception(
+                "summaries of groups need every report, they do not work with streaming or when updating a summary"
+            )
+        if all_name in groups:
+            raise Exception(
+                f"{all_name} is the summary of all cost centers, please rename the group"
+            )
+        # Group names are file names in output_dir, not paths out of it
+        for group in groups:
+            if group in ("", ".", "..") or any(sep in group for sep in "/\\"):
+                raise Exception(
+                    f"group {group!r} is not a file name, please rename the group"
+                )
+
+        jobs = {all_name: self.budgets}
+        for group, cost_centers in groups.items():
+            missing = sorted(set(cost_centers) - set(self.budgets.cost_centers))
+            if missing:
+                print(f"Warning: group {group} has no reports for {' '.join(missing)}")
+            budgets = self.budgets.select(cost_centers)
+            if not budgets:
+                print(f"Warning: group {group} has no reports, it is left out")
+                continue
+            jobs[group] = budgets
+
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {group: os.path.join(output_dir, f"{group}.xlsx") for group in jobs}
+        with self.stage("groups"):
+            self.save_jobs(jobs, paths, workers)
+        if self.stats is not None:
+            self.stats.count("summaries", len(jobs))
+        self.disable_stats()
+        return paths
+
+    # Most cost centers that fit on one sheet with their columns in every month
+    def max_cost_centers(self) -> int:
+        return (EXCEL_MAX_COLUMNS - self.offset - 1) // len(self.month_header) - len(
+            self.column_standard_header
+        )
+
+    # More cost centers than fit on one sheet, or than shard_size
+    def needs_shards(self, shard_size=None) -> bool:
+        return len(self.cost_center_list) > self.check_shard_size(shard_size)
+
+    # shard_size checked, as many cost centers as fit on one sheet for None
+    def check_shard_size(self, shard_size=None) -> int:
+        if shard_size is None:
+            return self.max_cost_centers()
+        if shard_size < 1:
+            raise Exception(f"shard_size is {shard_size}, it should be at least 1")
+        return shard_size
+
+    # Split a summary too wide for one sheet into shards of at most shard_size
+    # cost centers, by default as many as fit. Every shard is the summary of
+    # its cost centers, saved as "<output_path> (<first>-<last>).xlsx" by a
+    # worker process. output_path gets the index: the summary without cost
+    # center columns, so it has the totals of every cost center, and a list
+    # of the shards. Returns shard: path, the index is "index".
+    def save_shards(self, output_path, shard_size=None, workers=1) -> dict:
+        if self.streaming or self.summary is not None:
+            raise Exception(
+                "sharding a summary needs every report, it does not work with streaming or when updating a summary"
+            )
+        shard_size = self.check_shard_size(shard_size)
+        stem = os.path.splitext(output_path)[0]
+        jobs = {}
+        paths = {}
+        for start in range(0, len(self.cost_center_list), shard_size):
+            cost_centers = self.cost_center_list[start : start + shard_size]
+            shard = f"{cost_centers[0]}-{cost_centers[-1]}"
+            jobs[shard] = self.budgets.select(cost_centers)
+            paths[shard] = f"{stem} ({shard}).xlsx"
+
+        # The index is made here while the workers make the shards
+        def make_index():
+            self.cost_center_list = []
+            self.make_compilation()
+            self.add_shard_list(jobs, paths)
+
+        with self.stage("shards"):
+            self.save_jobs(jobs, paths, workers, make_index)
+        if self.stats is not None:
+            self.stats.count("shards", len(jobs))
+        self.save(output_path)
+        return {"index": output_path, **paths}
+
+    # A sheet after the Summary Sheet with the workbook and cost centers of
+    # every shard
+    def add_shard_list(self, jobs, paths) -> None:
+        sheet = self.workbook.create_sheet("Shards")
+        sheet.append(
+            ["Workbook", "First cost center", "Last cost center", "Cost centers"]
+        )
+        for shard, budgets in jobs.items():
+            cost_centers = sorted(budgets.cost_centers)
+            sheet.append(
+                [
+                    os.path.basename(paths[shard]),
+                    cost_centers[0],
+                    cost_centers[-1],
+                    len(cost_centers),
+                ]
+            )
+
+    # Save the summary of every job, name: budgets, to its path with the
+    # options of this run, in parallel worker processes. parent_work, if
+    # given, is done here in the meantime.
+    def save_jobs(self, jobs, paths, workers, parent_work=None) -> None:
+        options = {"write_only": self.write_only, "formula_mode": self.formula_mode}
+        n_tasks = len(jobs) + (parent_work is not None)
+        if workers > 1 and n_tasks > 1 and jobs:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                futures = [
+                    executor.submit(save_summary, jobs[name], paths[name], options)
+                    for name in jobs
+                ]
+                if parent_work is not None:
+                    parent_work()
+                for future in futures:
+                    future.result()
+        else:
+            if parent_work is not None:
+                parent_work()
+            for name in jobs:
+                save_summary(jobs[name], paths[name], options)
+
+    # Totals of every node of the organisation, see RollupTree
+    def rollup(self, separator=NODE_SEPARATOR) -> RollupTree:
+        with self.stage("rollup"):
+            return RollupTree(self.budgets, separator)
+
+    # Monthly cost and budget of year per cost type with the missing months
+    # filled in, see Projection
+    def projection(self, year=None, method="median") -> Projection:
+        with self.stage("projection"):
+            return Projection(self.budgets, year, method)
+
+    def get_cost_centers(self) -> String:
+        cost_centers = ""
+        for cost_center in self.cost_center_list:
+            cost_centers += cost_center + " "
+        return cost_centers
+
+    # ------------------------------------------------------------------------------------------------------------
+    #           Load Data
+    # ------------------------------------------------------------------------------------------------------------
+
+    # Read only the metadata of every report and fail before parsing any table
+    # if there are duplicates or unknown cost centers
+    def check_reports(
+        self, input_dir_path, workers=1, known_cost_centers=None, manifest_path=None
+    ) -> dict:
+        manifest = make_manifest(input_dir_path, workers, manifest_path)
+        problems = check_manifest(manifest, known_cost_centers)
+        if problems["duplicates"] or problems["unknown_cost_centers"]:
+            raise Exception(
+                "Please fix the input files:\n"
+                + "\n".join(
+                    problems["duplicates"]
+                    + problems["unknown_cost_centers"]
+                    + problems["missing_months"]
+                )
+            )
+        for problem in problems["missing_months"]:
+            print(f"Warning: {problem}")
+        return manifest
+
+    def load_budgets(
+        self,
+        input_dir_path,
+        workers=1,
+        use_cache=False,
+        manifest=None,
+        periods=None,
+        cache_dir=None,
+        decimal=None,
+    ):
+        budgets = RunningTotals() if self.streaming else BudgetStore()
+        if manifest is not None:
+            files = [
+                file
+                for file, entry in manifest["files"].items()
+                if periods is None or entry["cost_date"] in periods
+            ]
+        else:
+            files = [
+                file for file in os.listdir(input_dir_path) if is_cost_report(file)
+            ]
+        file_paths = [os.path.join(input_dir_path, file) for file in files]
+        # Marker rows from the manifest spare the parser the search
+        marker_rows = [
+            manifest["files"][file]["marker_rows"] if manifest else None
+            for file in files
+        ]
+
+        # Only files that changed since the last run need parsing, cached
+        # reports are read when their turn comes
+        cache = None
+        if use_cache:
+            cache = open_parse_cache(input_dir_path, cache_dir, decimal)
+        cached = [False] * len(file_paths)
+        if cache is not None:
+            cached = [cache.has(file_path) for file_path in file_paths]
+        parse_paths = [
+            file_path
+            for file_path, is_cached in zip(file_paths, cached)
+            if not is_cached
+        ]
+        parse_marker_rows = [
+            rows for rows, is_cached in zip(marker_rows, cached) if not is_cached
+        ]
+
+        # Reports are merged in file order, whichever worker finishes first.
+        # When streaming only a few parsed reports wait in memory at a time.
+        parse = timed_parse_report if self.stats is not None else parse_report
+        parse = partial(parse, decimal=decimal)
+        if workers > 1 and len(parse_paths) > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            if self.streaming:
+                parsed_reports = bounded_map(
+                    executor, parse, parse_paths, parse_marker_rows, window=workers * 2
+                )
+            else:
+                chunksize = max(1, len(parse_paths) // (workers * 4))
+                parsed_reports = executor.map(
+                    parse, parse_paths, parse_marker_rows, chunksize=chunksize
+                )
+        else:
+            executor = None
+            parsed_reports = map(parse, parse_paths, parse_marker_rows)
+
+        def reports():
+            for file_path, rows, is_cached in zip(file_paths, marker_rows, cached):
+                if is_cached:
+                    report = cache.get(file_path)
+                    if report is not None:
+                        yield report
+                        continue
+                    report = parse(file_path, rows)  # The entry could not be read
+                else:
+                    report = next(parsed_reports)
+                if self.stats is not None:
+                    report, seconds = report
+                    self.stats.add_file(file_path, seconds)
+                if cache is not None:
+                    cache.put(file_path, report)
+                yield report
+
+        try:
+            for cost_date, cost_center, cost_types, values, node in reports():
+                budgets.add(cost_date, cost_center, cost_types, values, node)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            if cache is not None:
+                cache.save()
+
+        budgets.finish()
+        self.cost_center_list = sorted(budgets.cost_centers)
+        if self.stats is not None:
+            self.stats.count("files", len(file_paths))
+            self.stats.count("parsed_files", len(parse_paths))
+
+        return budgets
+
+    # ------------------------------------------------------------------------------------------------------------
+    #           Write Data
+    # ------------------------------------------------------------------------------------------------------------
+
+    # Only the value is written here, style_sheet styles every cell at the end
+    def write_to_cell(self, sheet, row, col, value, font, style=False) -> None:
+        sheet.cell(row, col, value)
+        self.cell_fonts[(row, col)] = (font, style)
+        length = len(str(value))
+        if length > self.column_widths.get(col, 0):
+            self.column_widths[col] = length
+
+    # Put every number of the summary in a SummaryGrid without touching a sheet.
+    # Cost types get a row each, by default in the order they first show up.
+    def make_grid(self, cost_types=None) -> SummaryGrid:
+        budgets = self.budgets
+        if cost_types is None:
+            cost_types = budgets.cost_types_by_period()
+        grid = SummaryGrid(
+            cost_types,
+            self.cost_center_list,
+            self.month_header,
+            self.column_standard_header,
+            self.offset,
+        )
+
+        # Grid row or column of every code in the store
+        month_cols = np.array(
+            [grid.month_col(cost_date) for cost_date in budgets.periods], dtype=int
+        )
+        type_rows = np.array(
+            [grid.cost_type_rows[cost_type] for cost_type in budgets.cost_types],
+            dtype=int,
+        )
+        # -1 for cost centers without a column, like in the index of shards
+        center_offsets = np.array(
+            [
+                grid.center_offsets.get(cost_center, -1)
+                for cost_center in budgets.cost_centers
+            ],
+            dtype=int,
+        )
+
+        # Actual & planned
+        period_codes, type_codes, actual, planned = budgets.month_totals()
+        i_rows = type_rows[type_codes]
+        i_cols = month_cols[period_codes]
+        grid.values[i_rows, i_cols] = actual
+        grid.values[i_rows, i_cols + 1] = planned
+
+        # Check that cost is ending up in the right place
+        header = np.array(grid.header, dtype=object)
+        for cost_date, cost_center in budgets:
+            if center_offsets[budgets.cost_centers[cost_center]] < 0:
+                continue
+            header_center = header[
+                month_cols[budgets.periods[cost_date]]
+                + center_offsets[budgets.cost_centers[cost_center]]
+            ]
+            if header_center != cost_center:
+                raise Exception(
+                    f"The cost center in header is {header_center}. The cost center for the data is {cost_center} for date {cost_date}"
+                )
+
+        # Add cost for individual cost centers
+        period_codes, center_codes, type_codes, actual = budgets.center_actuals()
+        has_column = center_offsets[center_codes] >= 0
+        period_codes = period_codes[has_column]
+        center_codes = center_codes[has_column]
+        type_codes = type_codes[has_column]
+        actual = actual[has_column]
+        i_rows = type_rows[type_codes]
+        i_cols = month_cols[period_codes] + center_offsets[center_codes]
+        grid.values[i_rows, i_cols] = actual
+
+        # Fill in blank cells of the months with data, Diff gets a formula
+        data_columns = np.zeros(grid.n_columns, dtype=bool)
+        for month_col in month_cols:
+            data_columns[month_col : month_col + grid.same_every_col] = True
+        data_columns[grid.diff_position :: grid.same_every_col] = False
+        filled = grid.values[:, data_columns]
+        filled[np.isnan(filled)] = 0
+        grid.values[:, data_columns] = filled
+
+        return grid
+
+    def make_compilation(self) -> None:
+        if self.summary is not None:
+            self.update_compilation()
+            return
+
+        with self.stage("aggregation"):
+            grid = self.make_grid()
+        if self.budgets.periods:
+            self.year = "." + self.budgets.latest_year()
+
+        if self.write_only:
+            with self.stage("compilation"):
+                self.stream_compilation(
+                    self.workbook.create_sheet("Summary Sheet"), grid
+                )
+            return
+
+        compilation_sheet = self.workbook.active
+        compilation_sheet.title = "Summary Sheet"
+        with self.stage("compilation"):
+            # Column headers
+            self.add_column_headers(compilation_sheet, grid)
+
+            # Cost types, costs and the differential Actual-Planned
+            self.write_grid(
+                compilation_sheet, grid, range(len(grid.values)), range(grid.n_columns)
+            )
+
+            self.make_sum_rows(compilation_sheet, grid)
+        with self.stage("styling"):
+            self.style_sheet(compilation_sheet, grid)
+        if self.stats is not None:
+            self.stats.count("cells_written", len(self.cell_fonts))
+
+    # Write the summary to the write-only worksheet ws a row at a time. Every
+    # row is planned from the grid, styled and streamed before the next one,
+    # so only the cells of the sum rows are ever held at once.
+    def stream_compilation(self, ws, grid) -> None:
+        sheet = PlannedSheet(ws.title)
+
+        # Columns are written before the first row, so the width of the cost
+        # type column comes from its labels instead of the written cells
+        self.column_widths[self.offset] = max(
+            len(str(label)) for label in [*grid.cost_type_rows, *SUM_ROW_LABELS]
+        )
+        self.style_columns(sheet, grid)
+
+        style, cell_styles = self.cell_styler(grid)
+        cells_written = 0
+
+        def cell_style(i_row, i_col):
+            nonlocal cells_written
+            if not (
+                self.offset <= i_row <= grid.last_row
+                and self.offset <= i_col <= grid.sum_col
+            ):
+                return None
+            key = (i_row, i_col)
+            cells_written += key in self.cell_fonts
+            font, numeric = self.cell_fonts.pop(key, (None, False))
+            return style(i_row, i_col, font, numeric)
+
+        def stream(last_row):
+            sheet.stream_rows(ws, last_row, grid.sum_col, cell_style)
+
+        self.add_column_headers(sheet, grid)
+        stream(self.offset)
+        self.write_grid(
+            sheet, grid, range(len(grid.values)), range(grid.n_columns), stream
+        )
+        self.make_sum_rows(sheet, grid)
+        stream(grid.last_row)
+
+        if self.stats is not None:
+            self.stats.count("cells_written", cells_written)
+            self.stats.count(
+                "cells_styled",
+                (grid.last_row - self.offset + 1) * (grid.sum_col - self.offset + 1),
+            )
+            self.stats.count("cell_styles", len(cell_styles))
+
+    # Write the cost type label, the given grid columns and the sum of months
+    # for the given grid rows. row_done is called with every sheet row done.
+    def write_grid(self, sheet, grid, grid_rows, grid_cols, row_done=None) -> None:
+        cost_types = list(grid.cost_type_rows)
+        diffs = row_sums = None
+        if self.formula_mode != "formulas":
+            diffs = grid.diffs()
+            row_sums = grid.row_sums()
+        for i_grid_row in grid_rows:
+            cost_type = cost_types[i_grid_row]
+            i_row = grid.first_row + i_grid_row
+            self.write_to_cell(
+                sheet, i_row, self.offset, cost_type, Style.FONT_STANDARD
+            )  # Add cost type
+            self.cost_types[cost_type] = i_row
+
+            row_values = grid.values[i_grid_row]
+            for i_grid_col in grid_cols:
+                cost = row_values[i_grid_col]
+                i_col = grid.first_col + i_grid_col
+                if i_grid_col % grid.same_every_col == grid.diff_position:
+                    budget_col_letter = get_column_letter(i_col - 1)
+                    actual_col_letter = get_column_letter(i_col - 2)
+                    self.write_formula(
+                        sheet,
+                        i_row,
+                        i_col,
+                        f"={budget_col_letter}{i_row}-{actual_col_letter}{i_row}",
+                        (
+                            None
+                            if diffs is None
+                            else diffs[i_grid_row, i_grid_col // grid.same_every_col]
+                        ),
+                        Style.FONT_STANDARD,
+                        style=True,
+                    )
+                    continue
+                elif np.isnan(cost):
+                    continue
+                self.write_to_cell(
+                    sheet,
+                    i_row,
+                    i_col,
+                    cost,
+                    Style.FONT_STANDARD,
+                    style=True,
+                )
+
+            # Add a sum of months for each row
+            cell_value = f"="
+            for month_col in range(grid.first_col, grid.sum_col, grid.same_every_col):
+                cell_value += f"+ {get_column_letter(month_col)}{i_row}"
+            self.write_formula(
+                sheet,
+                i_row,
+                grid.sum_col,
+                cell_value,
+                None if row_sums is None else row_sums[i_grid_row],
+                Style.FONT_SMALL_BOLD,
+                style=True,
+            )
+            if row_done is not None:
+                row_done(i_row)
+
+    # Write the formula, its result or both, depending on formula_mode
+    def write_formula(
+        self, sheet, row, col, formula, result, font, style=False
+    ) -> None:
+        if self.formula_mode == "values":
+            self.write_to_cell(sheet, row, col, result, font, style)
+            return
+        self.write_to_cell(sheet, row, col, formula, font, style)
+        if self.formula_mode == "hybrid":
+            self.cached_values[(row, col)] = result
+
+    def add_column_headers(self, sheet, grid) -> None:
+        # Add title to table
+        # self.write_to_cell(sheet, self.offset, self.offset, sheet.title, Style.FONT_BIG_BOLD)
+
+        # Add standard headers to worksheet
+        for i_grid_col, header in enumerate(grid.header):
+            if i_grid_col % grid.same_every_col == 0:
+                font = Style.FONT_BIG_BOLD  # Month
+            else:
+                font = Style.FONT_SMALL_BOLD
+            self.write_to_cell(
+                sheet, self.offset, grid.first_col + i_grid_col, header, font
+            )
+
+        # Add Sum title in end
+        self.write_to_cell(
+            sheet,
+            self.offset,
+            grid.sum_col,
+            "Sum:",
+            Style.FONT_BIG_BOLD,
+            style=False,
+        )
+
+    def make_sum_rows(self, sheet, grid) -> None:
+        same_every_col = grid.same_every_col
+
+        # Months with data get the sum of their Budget column, the others the
+        # median of the months before
+        summed_budget = [
+            f"{i_month + 1:03d}{self.year}" in self.periods
+            for i_month in range(len(self.month_header))
+        ]
+        column_sums = sums = None
+        if self.formula_mode != "formulas":
+            column_sums = grid.column_sums()
+            sums = grid.sum_rows(column_sums, summed_budget)
+
+        def result(name, col):
+            if sums is None:
+                return None
+            return sums[name][(col - grid.first_col) // same_every_col]
+
+        # Sum all columns
+        row_total = grid.total_row
+        self.write_to_cell(sheet, row_total, self.offset, "Cost", Style.FONT_SMALL_BOLD)
+        for col in range(self.offset + 1, grid.sum_col):
+            column_letter = get_column_letter(col)
+            self.write_formula(
+                sheet,
+                row_total,
+                col,
+                f"=SUM({column_letter}{2}:{column_letter}{row_total-2})",
+                None if column_sums is None else column_sums[col - grid.first_col],
+                Style.FONT_SMALL_BOLD,
+                style=True,
+            )
+
+        # Move budget sums
+        row = row_total + 1
+        self.write_to_cell(sheet, row, self.offset, "Budget", Style.FONT_SMALL_BOLD)
+        for col in range(self.offset + 2, grid.sum_col, same_every_col):
+            column_letter = get_column_letter(col)
+            budget_sum = f"=SUM({column_letter}{2}:{column_letter}{row_total-2})"
+            self.write_to_cell(
+                sheet, row_total, col, "-", Style.FONT_STANDARD, style=True
+            )
+            if summed_budget[(col - grid.first_col) // same_every_col]:
+                formula = budget_sum
+            else:
+                formula = f"=MEDIAN({get_column_letter(self.offset+1)}{row}:{get_column_letter(col-2)}{row})"
+            self.write_formula(
+                sheet,
+                row,
+                col - 1,
+                formula,
+                result("Budget", col - 1),
+                Style.FONT_SMALL_BOLD,
+                style=True,
+            )
+
+        # Accumulation of sums
+        row = row_total + 2
+        self.write_to_cell(sheet, row, self.offset, "Cost (ACC)", Style.FONT_SMALL_BOLD)
+        for col in range(self.offset + 1, grid.sum_col, same_every_col):
+            column_letter = get_column_letter(col)
+            if col == self.offset + 1:
+                formula = f"=SUM({column_letter}{row-2}+0)"
+            else:
+                formula = f"=SUM({column_letter}{row-2}+{get_column_letter(col-same_every_col)}{row})"
+            self.write_formula(
+                sheet,
+                row,
+                col,
+                formula,
+                result("Cost (ACC)", col),
+                Style.FONT_SMALL_BOLD,
+                style=True,
+            )
+
+        # Accumulation of budgets
+        row = row_total + 3
+        self.write_to_cell(
+            sheet, row, self.offset, "Budget (ACC)", Style.FONT_SMALL_BOLD
+        )
+        for col in range(self.offset + 1, grid.sum_col, same_every_col):
+            column_letter = get_column_letter(col)
+            if col == self.offset + 1:
+                formula = f"=SUM({column_letter}{row-2}+0)"
+            else:
+                formula = f"=SUM({column_letter}{row-2}+{get_column_letter(col-same_every_col)}{row})"
+            self.write_formula(
+                sheet,
+                row,
+                col,
+                formula,
+                result("Budget (ACC)", col),
+                Style.FONT_SMALL_BOLD,
+                style=True,
+            )
+
+        # Differential row
+        row = row_total + 4
+        self.write_to_cell(sheet, row, self.offset, "Diff", Style.FONT_SMALL_BOLD)
+        for col in range(self.offset + 1, grid.sum_col, same_every_col):
+            column_letter = get_column_letter(col)
+            self.write_formula(
+                sheet,
+                row,
+                col,
+                f"={column_letter}{row-3} - {column_letter}{row-4}",
+                result("Diff", col),
+                Style.FONT_SMALL_BOLD,
+                style=True,
+            )
+
+            # Delete total duplicate in diff column
+            self.write_to_cell(
+                sheet, row_total, col + 2, "-", Style.FONT_STANDARD, style=True
+            )
+
+        # Differential (ACC) row
+        row = row_total + 5
+        self.write_to_cell(sheet, row, self.offset, "Diff (ACC)", Style.FONT_SMALL_BOLD)
+        for col in range(self.offset + 1, grid.sum_col, same_every_col):
+            column_letter = get_column_letter(col)
+            self.write_formula(
+                sheet,
+                row,
+                col,
+                f"={column_letter}{row-2} - {column_letter}{row-3}",
+                result("Diff (ACC)", col),
+                Style.FONT_SMALL_BOLD,
+                style=True,
+            )
+
+    # ------------------------------------------------------------------------------------------------------------
+    #           Update Summary
+    # ------------------------------------------------------------------------------------------------------------
+
+    # Layout of an earlier Summary Sheet: the row of every cost type, the cost
+    # centers and the months that already have data
+    def read_summary(self, sheet) -> dict:
+        cost_types = {}
+        i_row = self.offset + 1
+        while sheet.cell(i_row, self.offset).value is not None:
+            cost_types[sheet.cell(i_row, self.offset).value] = i_row
+            i_row += 1
+
+        # Cost centers are the headers up to the second month
+        cost_centers = []
+        i_col = self.offset + len(self.column_standard_header) + 1
+        while sheet.cell(self.offset, i_col).value != self.month_header[1]:
+            cost_centers.append(sheet.cell(self.offset, i_col).value)
+            i_col += 1
+        same_every_col = len(cost_centers) + len(self.column_standard_header)
+
+        # Blank cells are filled with 0 in months with data
+        months = set()
+        if cost_types:
+            for i in range(len(self.month_header)):
+                i_col = self.offset + 1 + i * same_every_col
+                if sheet.cell(self.offset + 1, i_col).value is not None:
+                    months.add(i + 1)
+
+        return {
+            "cost_types": cost_types,
+            "cost_centers": cost_centers,
+            "months": months,
+        }
+
+    # Put the costs of the months already in the summary into the grid, for
+    # the given rows of the sheet. Diff columns are left out, they are worked
+    # out again.
+    def read_summary_values(self, sheet, grid, sheet_rows) -> None:
+        for i_grid_row, i_row in enumerate(sheet_rows):
+            for month in self.summary["months"]:
+                month_col = (month - 1) * grid.same_every_col
+                for i_grid_col in range(month_col, month_col + grid.same_every_col):
+                    if i_grid_col % grid.same_every_col == grid.diff_position:
+                        continue
+                    value = sheet.cell(i_row, grid.first_col + i_grid_col).value
+                    if isinstance(value, (int, float)):
+                        grid.values[i_grid_row, i_grid_col] = value
+
+    # Fill in only the months missing from the summary, add rows for new cost
+    # types and rewrite the sum rows below them
+    def update_compilation(self) -> None:
+        sheet = self.workbook["Summary Sheet"]
+        new_cost_centers = sorted(
+            set(self.cost_center_list) - set(self.summary["cost_centers"])
+        )
+        if new_cost_centers:
+            raise Exception(
+                f"cost centers {' '.join(new_cost_centers)} are not in the summary, please make a new one"
+            )
+        self.cost_center_list = self.summary["cost_centers"]
+        if not self.budgets:
+            return  # Every month is already in the summary
+
+        old_cost_types = self.summary["cost_types"]
+        cost_types = list(old_cost_types) + [
+            cost_type
+            for cost_type in self.budgets.cost_types_by_period()
+            if cost_type not in old_cost_types
+        ]
+        with self.stage("aggregation"):
+            grid = self.make_grid(cost_types)
+        self.year = "." + self.budgets.latest_year()
+        self.periods |= {f"{month:03d}{self.year}" for month in self.summary["months"]}
+
+        # New cost types get 0 in the months that already had data
+        for month in self.summary["months"]:
+            month_col = (month - 1) * grid.same_every_col
+            grid.values[
+                len(old_cost_types) :, month_col : month_col + grid.same_every_col
+            ] = 0
+
+        # Written values need the costs of the months already in the summary
+        if self.formula_mode != "formulas":
+            self.read_summary_values(sheet, grid, old_cost_types.values())
+
+        with self.stage("compilation"):
+            # Move the blank row and the sum rows below the new cost types
+            old_last_cost_type_row = self.offset + len(old_cost_types)
+            sheet.delete_rows(
+                old_last_cost_type_row + 1, grid.last_row - grid.total_row + 2
+            )
+
+            new_cols = []
+            for cost_date in self.budgets.periods:
+                month_col = grid.month_col(cost_date)
+                new_cols += range(month_col, month_col + grid.same_every_col)
+            if self.formula_mode != "formulas":
+                # Diffs of the old months are written again, so they get values
+                for month in self.summary["months"]:
+                    month_col = (month - 1) * grid.same_every_col
+                    new_cols.append(month_col + grid.diff_position)
+            self.write_grid(sheet, grid, range(len(old_cost_types)), new_cols)
+            self.write_grid(
+                sheet,
+                grid,
+                range(len(old_cost_types), len(cost_types)),
+                range(grid.n_columns),
+            )
+            self.make_sum_rows(sheet, grid)
+        if self.stats is not None:
+            self.stats.count("cells_written", len(self.cell_fonts))
+
+        # Restyle the new months and everything from the old last cost type row
+        # down, its bottom border moves with the new rows
+        for i_col in range(self.offset + 1, grid.sum_col + 1):
+            if (old_last_cost_type_row, i_col) not in self.cell_fonts and (
+                sheet.cell(old_last_cost_type_row, i_col).value is not None
+            ):
+                self.cell_fonts[(old_last_cost_type_row, i_col)] = (
+                    Style.FONT_STANDARD,
+                    True,
+                )
+        regions = [
+            (
+                range(max(old_last_cost_type_row, grid.first_row), grid.last_row + 1),
+                range(self.offset, grid.sum_col + 1),
+            )
+        ]
+        for cost_date in self.budgets.periods:
+            month_col = grid.first_col + grid.month_col(cost_date)
+            regions.append(
+                (
+                    range(grid.first_row, old_last_cost_type_row),
+                    range(month_col, month_col + grid.same_every_col),
+                )
+            )
+        with self.stage("styling"):
+            self.style_cells(sheet, grid, regions)
+
+        # Widen the cost type column if a new cost type is longer
+        width = sheet.column_dimensions[get_column_letter(self.offset)].width
+        self.column_widths[self.offset] = max(
+            self.column_widths.get(self.offset, 0), round(width / 1.05)
+        )
+        self.autosize_column(sheet, [self.offset])
+
+    # ------------------------------------------------------------------------------------------------------------
+    #           Fix style
+    # ------------------------------------------------------------------------------------------------------------
+
+    # Width from the longest value written to the column
+    def autosize_column(self, ws, columnrange, length=0) -> None:
+        for column in columnrange:
+            if not length:
+                length = (
+                    self.column_widths.get(column, 0) * 1.05
+                )  # Libre Office: *0.87, Microsoft Excel: *1.05
+            ws.column_dimensions[get_column_letter(column)].width = length
+
+    # First and last index of every region, where the thick borders go
+    def region_edges(self, regions) -> tuple:
+        starts = {start for start, end in regions if start <= end}
+        ends = {end for start, end in regions if start <= end}
+        return starts, ends
+
+    def make_cell_style(
+        self, font, numeric, fill, left, right, top, bottom
+    ) -> CellStyle:
+        border = Border(
+            left=Style.SIDE_THICK if left else Style.BORDER_DOTTED.left,
+            right=Style.SIDE_THICK if right else Style.BORDER_DOTTED.right,
+            top=Style.SIDE_THICK if top else Style.BORDER_DOTTED.top,
+            bottom=Style.SIDE_THICK if bottom else Style.BORDER_DOTTED.bottom,
+        )
+        if numeric:
+            return CellStyle(
+                Style.NUMBER_STYLE, None, fill, border, Style.ALIGNMENT_RIGHT
+            )
+        return CellStyle(None, font, fill, border)
+
+    # Function giving the CellStyle of a cell from where it is, its font and
+    # whether it is a number, and the styles made so far. Every combination
+    # gets one CellStyle.
+    def cell_styler(self, grid) -> tuple:
+        same_every_col = grid.same_every_col
+        max_row = grid.last_row
+        max_column = grid.sum_col
+        last_cost_type_row = grid.last_cost_type_row
+
+        # Column colors, alternating between months
+        color_1 = [Style.COLOR_BLUE_1, Style.COLOR_YELLOW_1]
+        color_2 = [Style.COLOR_BLUE_2, Style.COLOR_YELLOW_2]
+        color_3 = [Style.COLOR_BLUE_3, Style.COLOR_YELLOW_3]
+        column_fills = {}
+        for i_col in range(self.offset + 1, max_column):
+            i_month, position = divmod(i_col - self.offset - 1, same_every_col)
+            if position == 0:
+                column_fills[i_col] = color_1[i_month % 2]
+            elif position < len(self.column_standard_header):
+                column_fills[i_col] = color_2[i_month % 2]
+            else:
+                column_fills[i_col] = color_3[i_month % 2]
+
+        # Thick borders around cost types and sum rows, and around the cost
+        # type column, the months and the sum column
+        row_starts, row_ends = self.region_edges(
+            [
+                (self.offset, last_cost_type_row),
+                (last_cost_type_row + 1, max_row),
+            ]
+        )
+        col_starts, col_ends = self.region_edges(
+            [
+                (self.offset, self.offset),
+                (self.offset + 1, max_column - 1),
+                (max_column, max_column),
+            ]
+        )
+
+        cell_styles = {}
+
+        def style(i_row, i_col, font, numeric) -> CellStyle:
+            fill = column_fills.get(i_col)
+            top = i_row in row_starts
+            bottom = i_row in row_ends
+            left = i_col in col_starts
+            right = i_col in col_ends
+            key = (id(font), numeric, id(fill), left, right, top, bottom)
+            cell_style = cell_styles.get(key)
+            if cell_style is None:
+                cell_style = cell_styles[key] = self.make_cell_style(
+                    font, numeric, fill, left, right, top, bottom
+                )
+            return cell_style
+
+        return style, cell_styles
+
+    # Style every cell in the given regions, (rows, cols) pairs, in one pass
+    def style_cells(self, sheet, grid, regions) -> None:
+        style, cell_styles = self.cell_styler(grid)
+        style_arrays = {}
+        for rows, cols in regions:
+            for i_row in rows:
+                for i_col in cols:
+                    font, numeric = self.cell_fonts.get((i_row, i_col), (None, False))
+                    style(i_row, i_col, font, numeric).apply(
+                        sheet.cell(i_row, i_col), style_arrays
+                    )
+
+        if self.stats is not None:
+            self.stats.count(
+                "cells_styled", sum(len(rows) * len(cols) for rows, cols in regions)
+            )
+            self.stats.count("cell_styles", len(cell_styles))
+
+    # Style every cell of the table and set up the columns
+    def style_sheet(self, sheet, grid) -> None:
+        self.style_cells(
+            sheet,
+            grid,
+            [
+                (
+                    range(self.offset, grid.last_row + 1),
+                    range(self.offset, grid.sum_col + 1),
+                )
+            ],
+        )
+        self.style_columns(sheet, grid)
+
+    # Hide the columns of every month but its first and size the columns
+    def style_columns(self, sheet, grid) -> None:
+        same_every_col = grid.same_every_col
+        max_column = grid.sum_col
+
+        # Hide columns
+        sheet.sheet_properties.outlinePr.summaryRight = False
+        for i in range(
+            same_every_col - 1
+        ):  # Grouping several at once does not work, but one at a time works
+            for col in range(self.offset + 2 + i, max_column, same_every_col):
+                sheet.column_dimensions.group(
+                    get_column_letter(col), get_column_letter(col), hidden=True
+                )
+
+        # Size columns
+        self.autosize_column(sheet, [self.offset])
+        self.autosize_column(sheet, range(self.offset + 1, max_column + 1), 11)
+
+
+# Make and save the summary of reports loaded before. Module level so it can
+# run in worker processes.
+def save_summary(budgets, output_path, options) -> str:
+    budget = AutoBudget(None, budgets=budgets, **options)
+    try:
+        budget.make_compilation()
+        budget.save(output_path)
+    except BaseException:
+        budget.discard()
+        raise
+    return output_path
@@ -0,0 +1,548 @@
+import argparse
+import json
+import os
+import sys
+from datetime import date
+from .manifest import check_manifest, make_manifest
+
+COMMANDS = (
+    "build",
+    "batch",
+    "watch",
+    "rollup",
+    "forecast",
+    "serve",
+    "manifest",
+    "check",
+)
+MODES = ("standard", "write-only", "update")
+FORMULA_MODES = ("formulas", "values", "hybrid")  # Same as in budget
+EXPORT_FORMATS = ("parquet", "arrow")  # Same as in export
+PROJECTION_METHODS = ("median", "trend")  # Same as in projection
+
+
+def make_stats(args):
+    from .stats import RunStats
+
+    if args.stats or args.profile or args.trace_memory:
+        return RunStats(
+            args.stats, profile=args.profile, trace_memory=args.trace_memory
+        )
+    return None
+
+
+def build(args) -> int:
+    # pandas, numpy and openpyxl are only needed to build a summary
+    from .budget import AutoBudget
+
+    print("Hello, I am your budget automator")
+    stats = make_stats(args)
+    budget = AutoBudget(
+        args.input_dir,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        decimal=args.decimal,
+        manifest_path=args.manifest,
+        preflight=not args.no_preflight,
+        known_cost_centers=args.known_cost_centers,
+        write_only=args.mode == "write-only",
+        summary_path=args.summary if args.mode == "update" else None,
+        stats=stats,
+        streaming=args.streaming,
+        formula_mode=args.formula_mode,
+    )
+    if args.export is not None:
+        written = budget.export(args.export, args.export_format)
+        print(f"Exported {len(written)} files to {args.export}")
+
+    # Too many cost centers for one sheet, they are split over several workbooks
+    if args.mode != "update" and budget.needs_shards(args.shard_size):
+        output_path = args.output or f"Cost Report Summary {date.today()}.xlsx"
+        paths = budget.save_shards(output_path, args.shard_size, args.workers)
+        for path in paths.values():
+            print(f"Saved {path}")
+        return 0
+
+    budget.make_compilation()
+    output_path = args.output
+    if output_path is None:
+        output_path = (
+            f"Cost Report Summary {date.today()} ({budget.get_cost_centers()}).xlsx"
+        )
+    budget.save(output_path)
+    print(f"Saved {output_path}")
+    return 0
+
+
+# Groups file: a JSON object of group name and its cost centers. Cost
+# centers are strings, a number would lose the zeros of codes like "0010".
+def read_groups(path) -> dict:
+    with open(path) as f:
+        groups = json.load(f)
+    if not isinstance(groups, dict) or not all(
+        isinstance(cost_centers, list) for cost_centers in groups.values()
+    ):
+        raise Exception(f"{path} should map every group name to a list of cost centers")
+    for group, cost_centers in groups.items():
+        for cost_center in cost_centers:
+            if not isinstance(cost_center, str):
+                raise Exception(
+                    f'{path} has the cost center {cost_center} in group {group}, it should be a string like "0010"'
+                )
+    return groups
+
+
+def batch(args) -> int:
+    from .budget import AutoBudget
+
+    print("Hello, I am your budget automator")
+    groups = read_groups(args.groups)
+    budget = AutoBudget(
+        args.input_dir,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        decimal=args.decimal,
+        manifest_path=args.manifest,
+        preflight=not args.no_preflight,
+        known_cost_centers=args.known_cost_centers,
+        write_only=args.mode == "write-only",
+        stats=make_stats(args),
+        formula_mode=args.formula_mode,
+    )
+    paths = budget.save_groups(groups, args.output_dir, args.workers)
+    for path in paths.values():
+        print(f"Saved {path}")
+    return 0
+
+
+def watch(args) -> int:
+    from .watch import SummaryWatcher
+
+    print("Hello, I am your budget automator")
+    watcher = SummaryWatcher(
+        args.input_dir,
+        output_path=args.output,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        decimal=args.decimal,
+        manifest_path=args.manifest,
+        interval=args.interval,
+        debounce=args.debounce,
+        shard_size=args.shard_size,
+        write_only=args.mode == "write-only",
+        formula_mode=args.formula_mode,
+    )
+    print(f"Watching {args.input_dir}, stop with Ctrl+C")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def rollup(args) -> int:
+    from .budget import AutoBudget
+
+    budget = AutoBudget(
+        args.input_dir,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        decimal=args.decimal,
+        manifest_path=args.manifest,
+        preflight=not args.no_preflight,
+        known_cost_centers=args.known_cost_centers,
+    )
+    tree = budget.rollup(args.separator)
+
+    # Every node down to args.depth, below its parent
+    print(f"{'node':<50}{'actual':>16}{'planned':>16}{'diff':>16}")
+    nodes = [()]
+    while nodes:
+        path = nodes.pop()
+        actual, planned = tree.total(path, args.period, args.cost_type)
+        name = "  " * len(path) + (path[-1] if path else "All")
+        print(f"{name:<50}{actual:16.2f}{planned:16.2f}{planned - actual:16.2f}")
+        if args.depth is None or len(path) < args.depth:
+            nodes += reversed(tree.children(path))
+    return 0
+
+
+def forecast(args) -> int:
+    from .budget import AutoBudget
+
+    budget = AutoBudget(
+        args.input_dir,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        decimal=args.decimal,
+        manifest_path=args.manifest,
+        preflight=not args.no_preflight,
+        known_cost_centers=args.known_cost_centers,
+        streaming=args.streaming,
+    )
+    projection = budget.projection(args.year, args.method)
+    table = projection.forecast(args.by)
+
+    print(f"Forecast of {projection.year or 'no year'} by {args.method}")
+    print(f"{table.index.name:<50}" + "".join(f"{name:>16}" for name in table))
+    for name, row in table.iterrows():
+        print(f"{name:<50}" + "".join(f"{value:16.2f}" for value in row))
+    print(f"{'All':<50}" + "".join(f"{value:16.2f}" for value in table.sum()))
+    return 0
+
+
+def serve(args) -> int:
+    import threading
+    from .service import BudgetService, make_server, poll_changes, remove_socket
+
+    service = BudgetService(
+        args.input_dir,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        decimal=args.decimal,
+        manifest_path=args.manifest,
+        cache_size=args.cache_size,
+    )
+    server = make_server(service, args.host, args.port, args.socket)
+    stop = threading.Event()
+    if args.poll > 0:
+        threading.Thread(
+            target=poll_changes, args=(service, args.poll, stop), daemon=True
+        ).start()
+
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Answering queries on {where}, stop with Ctrl+C")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if args.socket is not None:
+            remove_socket(args.socket)
+    return 0
+
+
+def manifest(args) -> int:
+    manifest = make_manifest(args.input_dir, args.workers, args.manifest)
+    if args.json:
+        print(json.dumps(manifest, indent=1))
+        return 0
+    for file, entry in sorted(manifest["files"].items()):
+        print(f"{file}\t{entry['cost_date']}\t{entry['cost_center']}")
+    return 0
+
+
+def check(args) -> int:
+    problems = check_manifest(
+        make_manifest(args.input_dir, args.workers, args.manifest),
+        args.known_cost_centers,
+    )
+    errors = problems["duplicates"] + problems["unknown_cost_centers"]
+    for problem in errors:
+        print(f"Error: {problem}")
+    for problem in problems["missing_months"]:
+        print(f"Warning: {problem}")
+    return 1 if errors else 0
+
+
+def cost_center_set(value) -> set:
+    return {cost_center.strip() for cost_center in value.split(",")}
+
+
+def positive_int(value) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+    return number
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="auto-budget",
+        description="Summarize SAP cost center reports in an Excel workbook",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Shared by every command
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "input_dir",
+        nargs="?",
+        default="./data/",
+        help="folder with the .XLS, .xlsx or .csv reports (default: ./data/)",
+    )
+    common.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="processes reading reports (default: one per CPU)",
+    )
+    common.add_argument(
+        "--known-cost-centers",
+        type=cost_center_set,
+        help="comma separated cost centers, any other is an error",
+    )
+    common.add_argument(
+        "--manifest",
+        help="file to keep the report metadata in (default: .manifest.json in the input folder)",
+    )
+
+    # Shared by the commands that read reports into memory
+    cache = argparse.ArgumentParser(add_help=False)
+    cache.add_argument(
+        "--no-cache", action="store_true", help="do not use the parse cache"
+    )
+    cache.add_argument(
+        "--cache-dir",
+        help="folder of the parse cache (default: one for the input folder in the user's cache folder)",
+    )
+    cache.add_argument(
+        "--decimal",
+        choices=(".", ","),
+        help="decimal separator of costs written as text, when a report does not show which it is (default: comma in CSV separated by semicolons, point in CSV separated by commas)",
+    )
+
+    # Shared by the commands that make summaries
+    summary = argparse.ArgumentParser(parents=[cache], add_help=False)
+    summary.add_argument(
+        "--formula-mode",
+        choices=FORMULA_MODES,
+        default="formulas",
+        help="formulas lets Excel work out Diff, Sum and the sum rows, values writes the numbers and hybrid writes formulas with their numbers cached (default: formulas)",
+    )
+    summary.add_argument(
+        "--no-preflight",
+        action="store_true",
+        help="do not check the reports before reading them",
+    )
+    summary.add_argument("--stats", help="write a JSON run report to this file")
+    summary.add_argument(
+        "--profile", action="store_true", help="add a cProfile capture to --stats"
+    )
+    summary.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="add the peak memory of every stage to --stats",
+    )
+
+    build_parser = commands.add_parser(
+        "build", parents=[common, summary], help="build the summary workbook (default)"
+    )
+    build_parser.add_argument(
+        "-o", "--output", help="workbook to write (default: dated name)"
+    )
+    build_parser.add_argument(
+        "-m",
+        "--mode",
+        choices=MODES,
+        default="write-only",
+        help="write-only streams a new workbook, standard builds it in memory and update adds new months to --summary (default: write-only)",
+    )
+    build_parser.add_argument("--summary", help="summary workbook to update")
+    build_parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="fold every report into running totals as it is read, for very large input folders",
+    )
+    build_parser.add_argument(
+        "--export",
+        metavar="DIR",
+        help="also write every cost to this folder, partitioned by year (needs pyarrow)",
+    )
+    build_parser.add_argument(
+        "--export-format",
+        choices=EXPORT_FORMATS,
+        default="parquet",
+        help="file format of --export, parquet or arrow IPC (default: parquet)",
+    )
+    build_parser.add_argument(
+        "--shard-size",
+        type=positive_int,
+        help="most cost centers per workbook, more are split over several workbooks with an index (default: as many as fit on a sheet)",
+    )
+    build_parser.set_defaults(func=build)
+
+    batch_parser = commands.add_parser(
+        "batch",
+        parents=[common, summary],
+        help="build a summary workbook per group of cost centers and one of all, from one load",
+    )
+    batch_parser.add_argument(
+        "-g",
+        "--groups",
+        required=True,
+        help='JSON file of group names and their cost centers, like {"Sales": ["0010", "0020"]}',
+    )
+    batch_parser.add_argument(
+        "-o",
+        "--output-dir",
+        default=".",
+        help="folder for the workbooks, one <group>.xlsx per group and All.xlsx (default: .)",
+    )
+    batch_parser.add_argument(
+        "-m",
+        "--mode",
+        choices=MODES[:2],
+        default="write-only",
+        help="write-only streams the workbooks, standard builds them in memory (default: write-only)",
+    )
+    batch_parser.set_defaults(func=batch)
+
+    watch_parser = commands.add_parser(
+        "watch",
+        parents=[common, cache],
+        help="keep the reports in memory and save the summary again whenever they change",
+    )
+    watch_parser.add_argument(
+        "-o", "--output", help="workbook to write (default: dated name)"
+    )
+    watch_parser.add_argument(
+        "-m",
+        "--mode",
+        choices=MODES[:2],
+        default="write-only",
+        help="write-only streams the workbook, standard builds it in memory (default: write-only)",
+    )
+    watch_parser.add_argument(
+        "--formula-mode",
+        choices=FORMULA_MODES,
+        default="formulas",
+        help="formulas, values or hybrid, see build (default: formulas)",
+    )
+    watch_parser.add_argument(
+        "--shard-size",
+        type=positive_int,
+        help="most cost centers per workbook, see build (default: as many as fit on a sheet)",
+    )
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=1,
+        help="seconds between looks at the folder (default: 1)",
+    )
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=5,
+        help="seconds the folder has to stay unchanged before new files are read (default: 5)",
+    )
+    watch_parser.set_defaults(func=watch)
+
+    rollup_parser = commands.add_parser(
+        "rollup",
+        parents=[common, cache],
+        help="print the actual and planned totals of every node of the organisation",
+    )
+    rollup_parser.add_argument(
+        "--depth", type=int, help="deepest level to print (default: all)"
+    )
+    rollup_parser.add_argument("--period", help="only this period, like 001.2021")
+    rollup_parser.add_argument("--cost-type", help="only this cost type")
+    rollup_parser.add_argument(
+        "--separator",
+        default="/",
+        help="between the levels of a Cost Center Node (default: /)",
+    )
+    rollup_parser.add_argument(
+        "--no-preflight",
+        action="store_true",
+        help="do not check the reports before reading them",
+    )
+    rollup_parser.set_defaults(func=rollup)
+
+    forecast_parser = commands.add_parser(
+        "forecast",
+        parents=[common, cache],
+        help="print the cost and budget of a year with its missing months forecast",
+    )
+    forecast_parser.add_argument(
+        "--year", help="year to forecast, like 2021 (default: the latest one)"
+    )
+    forecast_parser.add_argument(
+        "--method",
+        choices=PROJECTION_METHODS,
+        default="median",
+        help="median of the months before, like the summary, or a linear trend (default: median)",
+    )
+    forecast_parser.add_argument(
+        "--by",
+        choices=("cost_type", "cost_center"),
+        default="cost_type",
+        help="one line per cost type or per cost center (default: cost_type)",
+    )
+    forecast_parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="keep only running totals instead of every report",
+    )
+    forecast_parser.add_argument(
+        "--no-preflight",
+        action="store_true",
+        help="do not check the reports before reading them",
+    )
+    forecast_parser.set_defaults(func=forecast)
+
+    serve_parser = commands.add_parser(
+        "serve",
+        parents=[common, cache],
+        help="load the reports once and answer aggregate queries over HTTP",
+    )
+    serve_parser.add_argument(
+        "--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)"
+    )
+    serve_parser.add_argument(
+        "--port", type=int, default=8765, help="port to listen on (default: 8765)"
+    )
+    serve_parser.add_argument(
+        "--socket", help="listen on this Unix socket instead of host and port"
+    )
+    serve_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="query results to keep (default: 256)",
+    )
+    serve_parser.add_argument(
+        "--poll",
+        type=float,
+        default=2,
+        help="seconds between checks for changed files, 0 only checks on POST /refresh (default: 2)",
+    )
+    serve_parser.set_defaults(func=serve)
+
+    manifest_parser = commands.add_parser(
+        "manifest", parents=[common], help="list period and cost center of every report"
+    )
+    manifest_parser.add_argument(
+        "--json", action="store_true", help="print the whole manifest as JSON"
+    )
+    manifest_parser.set_defaults(func=manifest)
+
+    check_parser = commands.add_parser(
+        "check",
+        parents=[common],
+        help="report duplicates, unknown cost centers and missing months",
+    )
+    check_parser.set_defaults(func=check)
+    return parser
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Without a command the summary is built, like the old script did
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["build"] + argv
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    if args.command == "build" and args.mode == "update" and args.summary is None:
+        parser.error("--mode update needs --summary")
+    return args.func(args)
@@ -0,0 +1,63 @@
+import numpy as np
+
+# pyarrow is only needed to export, install it with pip install pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = ds = None
+
+EXPORT_FORMATS = ("parquet", "arrow")
+
+
+# Strings with the given codes, stored once each like in the BudgetStore
+def dictionary_column(codes, names) -> "pa.DictionaryArray":
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes, type=pa.int32()), pa.array(list(names), type=pa.string())
+    )
+
+
+# Every loaded cost as an Arrow table in long format, one row per report and
+# cost type: period, year, cost_center, cost_type, actual, planned and diff.
+# Empty cells are nulls, diff is planned - actual with empty cells as 0 like
+# the Diff columns of the summary.
+def budget_table(store) -> "pa.Table":
+    if pa is None:
+        raise Exception("exporting needs pyarrow, please install it")
+    arrays = store.arrays()
+    actual = arrays["values"][:, 0]
+    planned = arrays["values"][:, 1]
+    period_years = np.array([int(period[4:]) for period in store.periods], dtype=int)
+    return pa.table(
+        {
+            "period": dictionary_column(arrays["period"], store.periods),
+            "year": pa.array(period_years[arrays["period"]], type=pa.int32()),
+            "cost_center": dictionary_column(arrays["cost_center"], store.cost_centers),
+            "cost_type": dictionary_column(arrays["cost_type"], store.cost_types),
+            "actual": pa.array(actual, from_pandas=True),
+            "planned": pa.array(planned, from_pandas=True),
+            "diff": pa.array(np.nan_to_num(planned) - np.nan_to_num(actual)),
+        }
+    )
+
+
+# Write the budget_table to output_dir as a dataset with a year=YYYY folder
+# per year, as Parquet or Arrow IPC files. Years in the table replace what
+# the folder had for them, other years are kept.
+def export_budgets(store, output_dir, file_format="parquet") -> list:
+    if file_format not in EXPORT_FORMATS:
+        raise Exception(
+            f"file_format is {file_format}, it should be one of {', '.join(EXPORT_FORMATS)}"
+        )
+    table = budget_table(store)
+    written = []
+    ds.write_dataset(
+        table,
+        output_dir,
+        format=file_format,
+        partitioning=ds.partitioning(pa.schema([("year", pa.int32())]), flavor="hive"),
+        basename_template=f"part-{{i}}.{file_format}",
+        existing_data_behavior="delete_matching",
+        file_visitor=lambda file: written.append(file.path),
+    )
+    return written
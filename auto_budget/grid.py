@@ -0,0 +1,71 @@
+import numpy as np
+from .projection import accumulate, fill_missing
+
+
+class SummaryGrid:
+    # Layout and numbers of the Summary Sheet, worked out before anything is
+    # written. values has one row per cost type and one column per sheet
+    # column of the month blocks, NaN where the sheet cell stays empty.
+    def __init__(
+        self, cost_types, cost_center_list, month_header, column_standard_header, offset
+    ) -> None:
+        self.same_every_col = len(cost_center_list) + len(column_standard_header)
+        self.n_columns = len(month_header) * self.same_every_col
+        self.diff_position = len(column_standard_header) - 1
+
+        # Index maps into the matrix
+        self.cost_type_rows = {
+            cost_type: i_row for i_row, cost_type in enumerate(cost_types)
+        }
+        self.center_offsets = {
+            cost_center: len(column_standard_header) + i
+            for i, cost_center in enumerate(cost_center_list)
+        }
+
+        # Header of every matrix column
+        self.header = []
+        for month in month_header:
+            self.header += [month] + column_standard_header[1:] + cost_center_list
+
+        self.values = np.full((len(cost_types), self.n_columns), np.nan)
+
+        # Where the matrix and the sum rows end up in the sheet
+        self.first_row = offset + 1
+        self.first_col = offset + 1
+        self.last_cost_type_row = offset + len(cost_types)
+        self.sum_col = self.first_col + self.n_columns
+        self.total_row = self.last_cost_type_row + 2
+        self.last_row = self.total_row + 5
+
+    def month_col(self, cost_date) -> int:
+        return (int(cost_date[:3]) - 1) * self.same_every_col
+
+    # ------------------------------------------------------------------------------------------------------------
+    #           Formula values
+    # ------------------------------------------------------------------------------------------------------------
+
+    # What the formulas of the summary work out to, for writing numbers
+    # instead. Empty cells count as 0, like they do in Excel.
+
+    # Budget - actual of every cost type and month, the Diff columns
+    def diffs(self) -> np.ndarray:
+        actual = np.nan_to_num(self.values[:, 0 :: self.same_every_col])
+        budget = np.nan_to_num(self.values[:, 1 :: self.same_every_col])
+        return budget - actual
+
+    # Actual cost of every cost type summed over the months, the Sum column
+    def row_sums(self) -> np.ndarray:
+        return np.nan_to_num(self.values[:, 0 :: self.same_every_col]).sum(axis=1)
+
+    # Sum of every column over the cost types, the Cost row
+    def column_sums(self) -> np.ndarray:
+        return np.nan_to_num(self.values).sum(axis=0)
+
+    # Every sum row per month, from the column_sums. summed_budget tells for
+    # every month if its budget is the sum of the Budget column or the median
+    # of the months before it, that median is 0 for the first month.
+    def sum_rows(self, column_sums, summed_budget) -> dict:
+        cost = column_sums[0 :: self.same_every_col]
+        budget = column_sums[1 :: self.same_every_col]
+        budget = fill_missing(budget, np.asarray(summed_budget, dtype=bool))[0]
+        return accumulate(cost, budget)
@@ -0,0 +1,143 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .reports import (
+    HEADER_MARKERS,
+    HEADER_ROWS,
+    PARSER_VERSION,
+    find_markers,
+    is_cost_report,
+    open_cost_report,
+    read_report_info,
+)
+
+MANIFEST_NAME = ".manifest.json"
+
+
+# Period, cost center and header marker rows of one report. Only the first
+# HEADER_ROWS rows are read, the whole sheet if the header is longer, the
+# table markers are left to parse_report.
+def read_manifest_entry(file_path) -> dict:
+    marker_rows = None
+    with open_cost_report(file_path, nrows=HEADER_ROWS) as cost_report:
+        try:
+            marker_rows = find_markers(cost_report, markers=HEADER_MARKERS)
+        except Exception:
+            if cost_report.nrows < HEADER_ROWS:
+                raise  # The whole sheet was read
+        if marker_rows is not None:
+            info = read_report_info(cost_report, marker_rows)
+    if marker_rows is None:
+        with open_cost_report(file_path) as cost_report:
+            marker_rows = find_markers(cost_report, markers=HEADER_MARKERS)
+            info = read_report_info(cost_report, marker_rows)
+    cost_date, cost_center, node = info
+    stat = os.stat(file_path)
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "cost_date": cost_date,
+        "cost_center": cost_center,
+        "node": node,
+        "marker_rows": marker_rows,
+    }
+
+
+# Read the metadata of every report in input_dir_path and save it as the
+# manifest, by default MANIFEST_NAME in input_dir_path. Entries of files
+# unchanged since the last manifest are reused.
+def make_manifest(input_dir_path, workers=1, manifest_path=None) -> dict:
+    if manifest_path is None:
+        manifest_path = os.path.join(input_dir_path, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    if previous.get("parser_version") != PARSER_VERSION:
+        previous = {"files": {}}
+
+    files = {}
+    read_files = []
+    for file in os.listdir(input_dir_path):
+        if is_cost_report(file):
+            stat = os.stat(os.path.join(input_dir_path, file))
+            entry = previous["files"].get(file)
+            if (
+                entry is not None
+                and entry["size"] == stat.st_size
+                and entry["mtime"] == stat.st_mtime_ns
+            ):
+                files[file] = entry
+            else:
+                files[file] = None
+                read_files.append(file)
+
+    read_paths = [os.path.join(input_dir_path, file) for file in read_files]
+    if workers > 1 and len(read_paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(read_paths) // (workers * 4))
+            entries = list(
+                executor.map(read_manifest_entry, read_paths, chunksize=chunksize)
+            )
+    else:
+        entries = [read_manifest_entry(file_path) for file_path in read_paths]
+    files.update(zip(read_files, entries))
+
+    # Only saved when an entry changed, so checking an unchanged folder over
+    # and over does not write it every time. A folder that cannot be written
+    # to, like a read only share, only means the reports are read again.
+    manifest = {"parser_version": PARSER_VERSION, "files": files}
+    if (
+        read_files
+        or files.keys() != previous["files"].keys()
+        or not os.path.exists(manifest_path)
+    ):
+        try:
+            with open(manifest_path + ".tmp", "w") as f:
+                json.dump(manifest, f, indent=1)
+            os.replace(manifest_path + ".tmp", manifest_path)
+        except OSError:
+            pass
+    return manifest
+
+
+# Find every duplicate, missing month and unknown cost center in the manifest
+def check_manifest(manifest, known_cost_centers=None) -> dict:
+    reports = {}
+    for file, entry in manifest["files"].items():
+        reports.setdefault((entry["cost_center"], entry["cost_date"]), []).append(file)
+    duplicates = [
+        f"cost center {cost_center} has a dublicate with the date {cost_date}: {', '.join(files)}"
+        for (cost_center, cost_date), files in reports.items()
+        if len(files) > 1
+    ]
+
+    # A cost center should have every month of its year up to the latest one
+    years = {}
+    for cost_center, cost_date in reports:
+        months = years.setdefault(cost_date[3:], {})
+        months.setdefault(cost_center, set()).add(int(cost_date[:3]))
+    missing_months = []
+    for year, months in years.items():
+        last_month = max(max(center_months) for center_months in months.values())
+        for cost_center, center_months in sorted(months.items()):
+            for month in range(1, last_month + 1):
+                if month not in center_months:
+                    missing_months.append(
+                        f"cost center {cost_center} has no report for {month:03d}{year}"
+                    )
+
+    unknown_cost_centers = []
+    if known_cost_centers is not None:
+        unknown_cost_centers = [
+            f"cost center {cost_center} is unknown"
+            for cost_center in sorted({cost_center for cost_center, _ in reports})
+            if cost_center not in known_cost_centers
+        ]
+
+    return {
+        "duplicates": duplicates,
+        "missing_months": missing_months,
+        "unknown_cost_centers": unknown_cost_centers,
+    }
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import re
+import time
+import numpy as np
+from collections import deque
+from pathlib import Path
+from .reports import (
+    END_MARKER,
+    PARSER_VERSION,
+    TABLE_MARKER,
+    find_markers,
+    open_cost_report,
+    read_report_info,
+)
+
+# Numbers written as text the way ERP exports do, with thousands separators,
+# a decimal point or comma and SAP's trailing minus, like "-1 234,50" or
+# "1.234,50-". Keyed by the decimal separator.
+NUMBER_TEXT = {
+    ".": re.compile(r"([+-]?)(\d{1,3}(?:[ ,\xa0']\d{3})+|\d*)(?:\.(\d*))?(-?)"),
+    ",": re.compile(r"([+-]?)(\d{1,3}(?:[ .\xa0']\d{3})+|\d*)(?:,(\d*))?(-?)"),
+}
+
+
+# Decimal separator of cost cells written as text. A cell that is a number
+# with only one of the separators decides it, like "1234,50" or "-505.0".
+# Cells like "1.234" or "1,234" could be either, hint is used for them then,
+# None without one. The point when every cell reads the same either way.
+def text_decimal(cells, hint=None):
+    ambiguous = False
+    for cell in cells:
+        point = NUMBER_TEXT["."].fullmatch(cell) is not None
+        comma = NUMBER_TEXT[","].fullmatch(cell) is not None
+        if point != comma:
+            return "." if point else ","
+        ambiguous |= point and ("," in cell or "." in cell)
+    return hint if ambiguous else "."
+
+
+# Number in a cost cell, NaN for empty cells. Text is read with the decimal
+# separator given, ValueError if it is not a number.
+def to_float(value, decimal=".") -> float:
+    if not isinstance(value, str):
+        return float(value)
+    text = value.strip()
+    if not text:
+        return np.nan
+    if decimal == ".":
+        try:
+            return float(text)
+        except ValueError:
+            pass
+    match = NUMBER_TEXT[decimal].fullmatch(text)
+    if match is None or not any(char.isdigit() for char in text):
+        return float(text)  # Like "1e-05" or "nan", else not a number
+    sign, integer, fraction, minus = match.groups()
+    negative = "-" in (sign, minus)
+    integer = re.sub(r"\D", "", integer) or "0"
+    return float(f"{'-' if negative else ''}{integer}.{fraction or '0'}")
+
+
+# Parse one cost center report into (cost_date, cost_center, cost_types,
+# values, node), values has an actual and a planned column of floats and node
+# is the whole Cost Center Node. engine is a
+# reader from reports.ENGINES, by default the fastest for the file type.
+# decimal is the decimal separator of text costs the report does not show
+# itself, by default the one the engine knows from the file, see text_decimal.
+# Module level so it can be sent to worker processes.
+def parse_report(file_path, marker_rows=None, engine=None, decimal=None) -> tuple:
+    with open_cost_report(file_path, engine) as cost_report:
+        hint = decimal or getattr(cost_report, "decimal", None)
+
+        # Find cost_date, cost_center and table index
+        marker_rows = find_markers(cost_report, marker_rows)
+        cost_date, cost_center, node = read_report_info(cost_report, marker_rows)
+        start_of_table = marker_rows[TABLE_MARKER] + 1
+        end_of_table = marker_rows[END_MARKER]
+
+        # Make table array
+        table = [
+            cost_report.row_values(row) for row in range(start_of_table, end_of_table)
+        ]
+
+    # Cost types are in column G, actual and planned are the first named
+    # columns after them
+    cost_columns = [
+        i_col
+        for i_col, column in enumerate(table[0])
+        if i_col > 6 and column not in ("Cost Element", "")
+    ][:2]
+    if len(cost_columns) < 2:
+        raise Exception(f"{file_path} has no actual and planned cost columns")
+    rows = [row for row in table[1:] if row[6] != ""]
+    cost_types = [row[6] for row in rows]
+    cells = [[row[i_col] for i_col in cost_columns] for row in rows]
+    decimal = text_decimal(
+        (
+            cell.strip()
+            for row in cells
+            for cell in row
+            if isinstance(cell, str) and cell.strip()
+        ),
+        hint,
+    )
+    if decimal is None:
+        raise Exception(
+            f"{file_path} has costs like 1,234 that could have a decimal point or comma, please give the decimal separator"
+        )
+    try:
+        values = np.array(
+            [[to_float(cell, decimal) for cell in row] for row in cells],
+            dtype=float,
+        ).reshape(len(rows), 2)
+    except ValueError as error:
+        raise Exception(f"{file_path} has a cost that is not a number: {error}")
+
+    return cost_date, cost_center, cost_types, values, node
+
+
+# parse_report and the seconds it took, for the run statistics
+def timed_parse_report(file_path, marker_rows=None, decimal=None) -> tuple:
+    start = time.perf_counter()
+    report = parse_report(file_path, marker_rows, decimal=decimal)
+    return report, time.perf_counter() - start
+
+
+# executor.map that keeps at most window calls in flight, so parsed reports do
+# not pile up when they are used slower than the workers parse them
+def bounded_map(executor, fn, *iterables, window):
+    pending = deque()
+    for args in zip(*iterables):
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, *args))
+    while pending:
+        yield pending.popleft().result()
+
+
+def file_hash(file_path) -> str:
+    return hashlib.sha1(Path(file_path).read_bytes()).hexdigest()
+
+
+class ParseCache:
+    # Parsed reports stored as column arrays in .npz files, one per input file.
+    # Entries are keyed by path, size, mtime and content hash, and the least
+    # recently used are evicted once the cache grows past max_bytes. decimal
+    # is the one given to parse_report, reports parsed with another are
+    # dropped.
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, decimal=None) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.decimal = decimal
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self.load_index()
+
+    def load_index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        if (
+            index.get("parser_version") != PARSER_VERSION
+            or index.get("decimal") != self.decimal
+        ):
+            self.clear()
+            index = {
+                "parser_version": PARSER_VERSION,
+                "decimal": self.decimal,
+                "entries": {},
+            }
+        return index
+
+    def clear(self) -> None:
+        for file in os.listdir(self.cache_dir):
+            if file.endswith(".npz"):
+                os.remove(os.path.join(self.cache_dir, file))
+
+    def entry_path(self, key) -> str:
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, name + ".npz")
+
+    # There is an entry for file_path and the file has not changed since
+    def has(self, file_path) -> bool:
+        entry = self.index["entries"].get(os.path.abspath(file_path))
+        stat = os.stat(file_path)
+        if entry is None or entry["size"] != stat.st_size:
+            return False
+        if entry["mtime"] != stat.st_mtime_ns:
+            # Touched but maybe not changed, compare content before giving up
+            if entry["hash"] != file_hash(file_path):
+                return False
+            entry["mtime"] = stat.st_mtime_ns
+        return True
+
+    def get(self, file_path):
+        if not self.has(file_path):
+            return None
+        key = os.path.abspath(file_path)
+        entry = self.index["entries"][key]
+        try:
+            with np.load(self.entry_path(key), allow_pickle=False) as data:
+                cost_date, cost_center, node = data["meta"].tolist()
+                cost_types = data["cost_types"].tolist()
+                values = data["values"]
+        except (OSError, ValueError, KeyError):
+            return None
+        entry["used"] = time.time()
+        return cost_date, cost_center, cost_types, values, node
+
+    def put(self, file_path, report) -> None:
+        cost_date, cost_center, cost_types, values, node = report
+        if not all(isinstance(cost_type, str) for cost_type in cost_types):
+            return  # A number as cost type, leave this report uncached
+
+        key = os.path.abspath(file_path)
+        path = self.entry_path(key)
+        stat = os.stat(file_path)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                meta=np.array([cost_date, cost_center, node]),
+                cost_types=np.array(cost_types, dtype=str),
+                values=values,
+            )
+        os.replace(path + ".tmp", path)
+        self.index["entries"][key] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": file_hash(file_path),
+            "bytes": os.path.getsize(path),
+            "used": time.time(),
+        }
+
+    def save(self) -> None:
+        # Evict least recently used entries until under max_bytes
+        entries = self.index["entries"]
+        total = sum(entry["bytes"] for entry in entries.values())
+        for key in sorted(entries, key=lambda key: entries[key]["used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries.pop(key)["bytes"]
+            try:
+                os.remove(self.entry_path(key))
+            except FileNotFoundError:
+                pass
+
+        with open(self.index_path + ".tmp", "w") as f:
+            json.dump(self.index, f)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+
+# The user's cache folder, with a folder for every input folder in it
+def default_cache_dir(input_dir_path) -> str:
+    base = (
+        os.environ.get("LOCALAPPDATA")
+        or os.environ.get("XDG_CACHE_HOME")
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    name = hashlib.sha1(os.path.abspath(input_dir_path).encode()).hexdigest()[:16]
+    return os.path.join(base, "auto-budget", name)
+
+
+# ParseCache in cache_dir, by default the one of input_dir_path in the user's
+# cache folder. None when the folder cannot be made or written to, the
+# reports are then parsed without a cache.
+def open_parse_cache(input_dir_path, cache_dir=None, decimal=None):
+    if cache_dir is None:
+        cache_dir = default_cache_dir(input_dir_path)
+    try:
+        cache = ParseCache(cache_dir, decimal=decimal)
+    except OSError as error:
+        print(f"Warning: not using the parse cache, {error}")
+        return None
+    if not os.access(cache_dir, os.W_OK):
+        print(f"Warning: not using the parse cache, {cache_dir} is read only")
+        return None
+    return cache
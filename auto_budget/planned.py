@@ -0,0 +1,70 @@
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.worksheet.dimensions import ColumnDimension, DimensionHolder
+from openpyxl.worksheet.properties import WorksheetProperties
+
+
+class PlannedCell:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = None
+
+
+class PlannedSheet:
+    # Stand-in for an openpyxl worksheet that only records cells, so rows of
+    # the summary can be planned in memory and then streamed out in order.
+    # Rows are dropped once streamed, they cannot be written again.
+    def __init__(self, title) -> None:
+        self.title = title
+        self.cells = {}
+        self.max_row = 1
+        self.max_column = 1
+        self.streamed_rows = 0
+        self.style_arrays = {}
+        self.column_dimensions = DimensionHolder(
+            worksheet=self, default_factory=self._add_column
+        )
+        self.sheet_properties = WorksheetProperties()
+
+    def _add_column(self) -> ColumnDimension:
+        return ColumnDimension(self)
+
+    def cell(self, row, column, value=None) -> PlannedCell:
+        cell = self.cells.get((row, column))
+        if cell is None:
+            if row <= self.streamed_rows:
+                raise Exception(f"row {row} of {self.title} is already streamed")
+            cell = self.cells[(row, column)] = PlannedCell()
+            self.max_row = max(self.max_row, row)
+            self.max_column = max(self.max_column, column)
+        if value is not None:
+            cell.value = value
+        return cell
+
+    # Write the rows up to last_row in order to a write-only worksheet,
+    # dropping their planned cells. Rows have n_columns cells, each gets the
+    # CellStyle style(row, column) gives and stays empty without a value or a
+    # style. Columns and sheet properties are set up before the first row.
+    def stream_rows(self, ws, last_row, n_columns, style) -> None:
+        if self.streamed_rows == 0:
+            ws.sheet_properties = self.sheet_properties
+            for key, dimension in self.column_dimensions.items():
+                dimension.parent = ws
+                ws.column_dimensions[key] = dimension
+
+        for i_row in range(self.streamed_rows + 1, last_row + 1):
+            row = []
+            for i_col in range(1, n_columns + 1):
+                planned_cell = self.cells.pop((i_row, i_col), None)
+                cell_style = style(i_row, i_col)
+                if planned_cell is None and cell_style is None:
+                    row.append(None)
+                    continue
+                cell = WriteOnlyCell(
+                    ws, None if planned_cell is None else planned_cell.value
+                )
+                if cell_style is not None:
+                    cell_style.apply(cell, self.style_arrays)
+                row.append(cell)
+            ws.append(row)
+        self.streamed_rows = max(self.streamed_rows, last_row)
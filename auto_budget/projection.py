@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+PROJECTION_METHODS = ("median", "trend")
+MONTHS = 12
+
+
+# values with the months without data filled in, one series per row.
+# has_data is a bool array of the same shape, or of one row for every series.
+# median: the median of every month before, filled in ones too, like the
+# MEDIAN formulas of the Budget row of the summary, 0 for the first month.
+# trend: the least squares line through the months with data, flat for one.
+def fill_missing(values, has_data, method="median") -> np.ndarray:
+    if method not in PROJECTION_METHODS:
+        raise Exception(
+            f"method is {method}, it should be one of {', '.join(PROJECTION_METHODS)}"
+        )
+    values = np.atleast_2d(np.nan_to_num(values))
+    has_data = np.broadcast_to(has_data, values.shape)
+    filled = np.where(has_data, values, 0.0)
+
+    if method == "median":
+        # A month at a time, every series at once
+        for month in range(1, filled.shape[1]):
+            missing = ~has_data[:, month]
+            if missing.any():
+                filled[missing, month] = np.median(filled[missing, :month], axis=1)
+        return filled
+
+    months = np.arange(filled.shape[1], dtype=float)
+    weights = has_data.astype(float)
+    n = weights.sum(axis=1)
+    sum_x = weights @ months
+    sum_xx = weights @ months**2
+    sum_y = filled.sum(axis=1)
+    sum_xy = filled @ months
+    denominator = n * sum_xx - sum_x**2
+    slope = np.divide(
+        n * sum_xy - sum_x * sum_y,
+        denominator,
+        out=np.zeros_like(n),
+        where=denominator != 0,
+    )
+    intercept = np.divide(sum_y - slope * sum_x, n, out=np.zeros_like(n), where=n > 0)
+    line = intercept[:, None] + slope[:, None] * months
+    return np.where(has_data, filled, line)
+
+
+# The sum rows of the summary for monthly cost and budget series, the months
+# are the last axis
+def accumulate(cost, budget) -> dict:
+    cost_acc = np.cumsum(cost, axis=-1)
+    budget_acc = np.cumsum(budget, axis=-1)
+    return {
+        "Cost": cost,
+        "Budget": budget,
+        "Cost (ACC)": cost_acc,
+        "Budget (ACC)": budget_acc,
+        "Diff": budget - cost,
+        "Diff (ACC)": budget_acc - cost_acc,
+    }
+
+
+class Projection:
+    # Cost and budget of every month of one year per cost type, and cost per
+    # cost center, from a BudgetStore or RunningTotals. Months without reports
+    # are filled in with method, see fill_missing, so the sums over the year
+    # are forecasts of it. year is like "2021", the latest year loaded by
+    # default. Empty cells count as 0.
+    def __init__(self, budgets, year=None, method="median") -> None:
+        if method not in PROJECTION_METHODS:
+            raise Exception(
+                f"method is {method}, it should be one of {', '.join(PROJECTION_METHODS)}"
+            )
+        periods = list(budgets.periods)
+        if year is None:
+            year = budgets.latest_year()
+        self.year = year
+        self.method = method
+        self.cost_types = list(budgets.cost_types)
+        self.cost_centers = list(budgets.cost_centers)
+
+        # Month of every period code, -1 for the other years
+        period_months = np.array(
+            [int(period[:3]) - 1 if period[4:] == year else -1 for period in periods],
+            dtype=int,
+        )
+
+        # Months with a report, per cost center and for any of them
+        self.center_months = np.zeros((len(self.cost_centers), MONTHS), dtype=bool)
+        for period, cost_center in budgets:
+            month = period_months[budgets.periods[period]]
+            if month >= 0:
+                self.center_months[budgets.cost_centers[cost_center], month] = True
+        self.has_data = self.center_months.any(axis=0)
+
+        # Per cost type and month
+        period_codes, type_codes, actual, planned = budgets.month_totals()
+        months = period_months[period_codes]
+        keep = months >= 0
+        self.cost = np.zeros((len(self.cost_types), MONTHS))
+        self.budget = np.zeros((len(self.cost_types), MONTHS))
+        self.cost[type_codes[keep], months[keep]] = np.nan_to_num(actual[keep])
+        self.budget[type_codes[keep], months[keep]] = np.nan_to_num(planned[keep])
+
+        # Per cost center and month, summed over the cost types
+        period_codes, center_codes, type_codes, actual = budgets.center_actuals()
+        months = period_months[period_codes]
+        keep = months >= 0
+        self.center_cost = np.bincount(
+            center_codes[keep] * MONTHS + months[keep],
+            weights=actual[keep],
+            minlength=len(self.cost_centers) * MONTHS,
+        ).reshape(len(self.cost_centers), MONTHS)
+
+    # Sum rows of every cost type, rows in the order of cost_types. Cost is
+    # the reported cost and Forecast the cost with the missing months filled
+    # in, Budget is filled in.
+    def series(self) -> dict:
+        budget = fill_missing(self.budget, self.has_data, self.method)
+        rows = accumulate(self.cost, budget)
+        rows["Forecast"] = fill_missing(self.cost, self.has_data, self.method)
+        rows["Forecast (ACC)"] = np.cumsum(rows["Forecast"], axis=1)
+        return rows
+
+    # Sum rows over every cost type, like the ones below the summary
+    def total(self) -> dict:
+        budget = self.budget.sum(axis=0)
+        budget = fill_missing(budget, self.has_data, self.method)[0]
+        return accumulate(self.cost.sum(axis=0), budget)
+
+    # Sums of the year by cost type or by cost center: the reported cost, the
+    # cost forecast for the whole year, and for cost types the budget of the
+    # year and budget - forecast. Cost centers have no budget of their own.
+    def forecast(self, by="cost_type") -> pd.DataFrame:
+        if by == "cost_type":
+            series = self.series()
+            forecast = series["Forecast"].sum(axis=1)
+            budget = series["Budget"].sum(axis=1)
+            return pd.DataFrame(
+                {
+                    "Cost": self.cost.sum(axis=1),
+                    "Forecast": forecast,
+                    "Budget": budget,
+                    "Diff": budget - forecast,
+                },
+                index=pd.Index(self.cost_types, name="Cost Type"),
+            )
+        if by == "cost_center":
+            forecast = fill_missing(self.center_cost, self.center_months, self.method)
+            return pd.DataFrame(
+                {
+                    "Cost": self.center_cost.sum(axis=1),
+                    "Forecast": forecast.sum(axis=1),
+                },
+                index=pd.Index(self.cost_centers, name="Cost Center"),
+            )
+        raise Exception(f"by is {by}, it should be cost_type or cost_center")
@@ -0,0 +1,202 @@
+import csv
+import mmap
+import os
+import xlrd
+from contextlib import contextmanager
+from itertools import islice
+
+# Optional, reads .XLS and .xlsx much faster than xlrd and openpyxl
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+SHEET_NAME = "Cost center report"
+
+# Marker text in column F of the "Cost center report" sheet
+PERIOD_MARKER = "Fiscal period / year (Interval, Req.)"
+COST_CENTER_MARKER = "Cost Center Node"
+TABLE_MARKER = "Table"
+END_MARKER = "HSQVBI_CCTR_GR"
+MARKERS = (PERIOD_MARKER, COST_CENTER_MARKER, TABLE_MARKER, END_MARKER)
+HEADER_MARKERS = (PERIOD_MARKER, COST_CENTER_MARKER)
+
+# Rows read for the manifest, the header markers are near the top
+HEADER_ROWS = 64
+
+# Marker rows found per sheet layout, so repeated exports skip the search
+layout_cache = {}
+
+
+# Rows of the given markers, known_rows (e.g. the header markers from the
+# manifest) are checked before use and the search goes on after them
+def find_markers(cost_report, known_rows=None, markers=MARKERS) -> dict:
+    layout = (cost_report.nrows, cost_report.ncols)
+    marker_rows = {}
+    for rows in (known_rows, layout_cache.get(layout)):
+        if rows and all(
+            row < cost_report.nrows and cost_report.cell_value(row, 5) == marker
+            for marker, row in rows.items()
+        ):
+            marker_rows = dict(rows)
+            break
+    if all(marker in marker_rows for marker in markers):
+        return marker_rows
+
+    # Stop as soon as every marker has been seen
+    start = max(marker_rows.values(), default=-1) + 1
+    for index in range(start, cost_report.nrows):
+        info_cost_elemnt = cost_report.cell_value(index, 5)
+        if info_cost_elemnt in MARKERS and info_cost_elemnt not in marker_rows:
+            marker_rows[info_cost_elemnt] = index
+            if all(marker in marker_rows for marker in markers):
+                break
+    else:
+        missing = [marker for marker in markers if marker not in marker_rows]
+        raise Exception(f"Could not find {missing} in the cost center report")
+
+    if markers == MARKERS:
+        layout_cache[layout] = marker_rows
+    return marker_rows
+
+
+# ------------------------------------------------------------------------------------------------------------
+#           Readers
+# ------------------------------------------------------------------------------------------------------------
+
+# Every reader opens a report and gives its "Cost center report" sheet with the
+# parts of the xlrd sheet the parser uses: nrows, ncols, cell_value and
+# row_values. Empty cells are "" and numbers floats, like xlrd has them. With
+# nrows only the first rows are read, where the engine allows it.
+
+
+class ReportSheet:
+    # A sheet read into memory by any of the other engines
+    def __init__(self, rows) -> None:
+        self.rows = [[xlrd_value(value) for value in row] for row in rows]
+        self.nrows = len(self.rows)
+        self.ncols = max((len(row) for row in self.rows), default=0)
+        self.decimal = None  # Of text costs, when the engine knows it
+        for row in self.rows:
+            row.extend([""] * (self.ncols - len(row)))
+
+    def cell_value(self, row, col):
+        return self.rows[row][col]
+
+    def row_values(self, row) -> list:
+        return self.rows[row]
+
+
+def xlrd_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, int):
+        return float(value)
+    return value
+
+
+# Map the file and load only the sheet we need. xlrd always reads the whole
+# sheet, nrows is ignored.
+@contextmanager
+def read_xlrd(file_path, nrows=None):
+    with (
+        open(file_path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as file_contents,
+    ):
+        wb = xlrd.open_workbook(file_contents=file_contents, on_demand=True)
+        try:
+            yield wb.sheet_by_name(SHEET_NAME)
+        finally:
+            wb.release_resources()
+
+
+@contextmanager
+def read_calamine(file_path, nrows=None):
+    wb = python_calamine.CalamineWorkbook.from_path(file_path)
+    try:
+        sheet = wb.get_sheet_by_name(SHEET_NAME)
+        yield ReportSheet(sheet.to_python(skip_empty_area=False, nrows=nrows))
+    finally:
+        wb.close()
+
+
+@contextmanager
+def read_openpyxl(file_path, nrows=None):
+    import openpyxl  # Only needed for .xlsx, the manifest should start fast
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield ReportSheet(wb[SHEET_NAME].iter_rows(max_row=nrows, values_only=True))
+    finally:
+        wb.close()
+
+
+# Decimal separator of CSV files by the separator of their cells. Excel
+# separates cells with semicolons where the comma is the decimal separator.
+CSV_DECIMALS = {",": ".", ";": ","}
+
+
+# The sheet saved as CSV, separated by commas, semicolons or tabs. Cells stay
+# text, the parser turns the costs into numbers.
+@contextmanager
+def read_csv(file_path, nrows=None):
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        dialect = csv.Sniffer().sniff(f.read(64 * 1024), delimiters=",;\t")
+        f.seek(0)
+        sheet = ReportSheet(islice(csv.reader(f, dialect), nrows))
+        sheet.decimal = CSV_DECIMALS.get(dialect.delimiter)
+        yield sheet
+
+
+ENGINES = {
+    "calamine": read_calamine,
+    "xlrd": read_xlrd,
+    "openpyxl": read_openpyxl,
+    "csv": read_csv,
+}
+
+# Engines for every file type, the fastest first
+FILE_ENGINES = {
+    ".xls": ("calamine", "xlrd"),
+    ".xlsx": ("calamine", "openpyxl"),
+    ".csv": ("csv",),
+}
+
+
+# Skips hidden files and the lock files Excel leaves next to open workbooks
+def is_cost_report(file) -> bool:
+    if file.startswith((".", "~$")):
+        return False
+    return os.path.splitext(file)[1].lower() in FILE_ENGINES
+
+
+# Engines that can read file_path and are installed, the fastest first
+def available_engines(file_path) -> list:
+    engines = FILE_ENGINES.get(os.path.splitext(file_path)[1].lower())
+    if engines is None:
+        raise Exception(f"{file_path} is not a .XLS, .xlsx or .csv cost report")
+    return [
+        engine
+        for engine in engines
+        if engine != "calamine" or python_calamine is not None
+    ]
+
+
+# Open the report with the given engine, by default the fastest one for its
+# type. nrows limits the rows read, see the readers.
+def open_cost_report(file_path, engine=None, nrows=None):
+    if engine is None:
+        engine = available_engines(file_path)[0]
+    return ENGINES[engine](file_path, nrows)
+
+
+# Period, cost center and the whole Cost Center Node, the path of the cost
+# center in the organisation. The cost center is its last 4 characters.
+def read_report_info(cost_report, marker_rows) -> tuple:
+    cost_date = cost_report.cell_value(marker_rows[PERIOD_MARKER], 6)
+    node = cost_report.cell_value(marker_rows[COST_CENTER_MARKER], 6)
+    return cost_date, node[-4:], node
+
+
+# Bump when parse_report changes what it extracts, so old cache entries are dropped
+PARSER_VERSION = 5
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Between the levels of a Cost Center Node, like "Company/Sales/CostCenter:0010"
+NODE_SEPARATOR = "/"
+
+
+# Levels of a Cost Center Node from the top of the organisation down to the
+# cost center
+def node_path(node, separator=NODE_SEPARATOR) -> tuple:
+    return tuple(part.strip() for part in node.split(separator) if part.strip())
+
+
+class RollupTree:
+    # Actual and planned totals of every node of the organisation per period
+    # and cost type, summed once when the tree is made. A node is its path, a
+    # tuple of the levels down to it. () is the whole organisation and the
+    # Cost Center Nodes of the reports are the leaves. Every node is summed
+    # from the report rows below it with the same compensated summation as
+    # BudgetStore.month_totals, so the totals of () match the summary.
+    def __init__(self, store, separator=NODE_SEPARATOR) -> None:
+        if not hasattr(store, "arrays"):
+            raise Exception(
+                "rollups need every report, they do not work with streaming"
+            )
+        self.periods = dict(store.periods)  # period: code
+        self.cost_types = dict(store.cost_types)  # cost type: code
+
+        # Every node with the code of its parent, -1 for the root
+        self.paths = {(): 0}  # path: code
+        parents = [-1]
+        leaf_codes = []
+        for node in store.nodes:
+            path = node_path(node, separator)
+            for depth in range(1, len(path) + 1):
+                if path[:depth] not in self.paths:
+                    self.paths[path[:depth]] = len(parents)
+                    parents.append(self.paths[path[: depth - 1]])
+            leaf_codes.append(self.paths[path])
+        self.parents = np.array(parents, dtype=np.int64)
+
+        # Every report row counts once for its leaf and once for every node
+        # above it, a level at a time
+        arrays = store.arrays()
+        row_nodes = np.array(leaf_codes, dtype=np.int64)[arrays["node"]]
+        rows = np.arange(len(row_nodes))
+        levels = []
+        while len(rows):
+            levels.append(
+                pd.DataFrame(
+                    {
+                        "node": row_nodes,
+                        "period": arrays["period"][rows],
+                        "cost_type": arrays["cost_type"][rows],
+                        "actual": arrays["values"][rows, 0],
+                        "planned": arrays["values"][rows, 1],
+                    }
+                )
+            )
+            row_nodes = self.parents[row_nodes]
+            rows = rows[row_nodes >= 0]
+            row_nodes = row_nodes[row_nodes >= 0]
+
+        if not levels:
+            levels.append(
+                pd.DataFrame(
+                    columns=["node", "period", "cost_type", "actual", "planned"]
+                )
+            )
+
+        # One row per node, period and cost type, sorted by node so the rows
+        # of a node are one slice
+        self.totals_frame = (
+            pd.concat(levels, ignore_index=True)
+            .groupby(["node", "period", "cost_type"])[["actual", "planned"]]
+            .sum()
+            .reset_index()
+        )
+        node_codes = self.totals_frame["node"].to_numpy(dtype=np.int64)
+        starts = np.searchsorted(node_codes, np.arange(len(parents)), side="left")
+        ends = np.searchsorted(node_codes, np.arange(len(parents)), side="right")
+        self.node_rows = [slice(start, end) for start, end in zip(starts, ends)]
+
+    def code(self, path) -> int:
+        code = self.paths.get(tuple(path))
+        if code is None:
+            raise Exception(f"{'/'.join(path)} is not a node of the organisation")
+        return code
+
+    def children(self, path=()) -> list:
+        code = self.code(path)
+        return [
+            child
+            for child, child_code in self.paths.items()
+            if self.parents[child_code] == code
+        ]
+
+    def depth(self) -> int:
+        return max(len(path) for path in self.paths)
+
+    # Actual and planned of the node per period and cost type
+    def totals(self, path=()) -> pd.DataFrame:
+        rows = self.totals_frame.iloc[self.node_rows[self.code(path)]]
+        periods = list(self.periods)
+        cost_types = list(self.cost_types)
+        return pd.DataFrame(
+            {
+                "period": [periods[code] for code in rows["period"]],
+                "cost_type": [cost_types[code] for code in rows["cost_type"]],
+                "actual": rows["actual"].to_numpy(),
+                "planned": rows["planned"].to_numpy(),
+            }
+        )
+
+    # Actual and planned of the node, in one period and for one cost type
+    # if given, else summed over them
+    def total(self, path=(), period=None, cost_type=None) -> tuple:
+        rows = self.totals_frame.iloc[self.node_rows[self.code(path)]]
+        keep = np.ones(len(rows), dtype=bool)
+        if period is not None:
+            keep &= rows["period"].to_numpy() == self.periods.get(period, -1)
+        if cost_type is not None:
+            keep &= rows["cost_type"].to_numpy() == self.cost_types.get(cost_type, -1)
+        return (
+            float(rows["actual"].to_numpy()[keep].sum()),
+            float(rows["planned"].to_numpy()[keep].sum()),
+        )
+
+    def __contains__(self, path) -> bool:
+        return tuple(path) in self.paths
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
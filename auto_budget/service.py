@@ -0,0 +1,395 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from .manifest import make_manifest
+from .parse import open_parse_cache, parse_report
+from .store import BudgetStore
+
+# Groupings a query can be broken down by, and the store codes they use
+GROUP_BY = {
+    "period": "periods",
+    "cost_center": "cost_centers",
+    "cost_type": "cost_types",
+}
+
+
+class BudgetService:
+    # The reports of input_dir_path loaded once and kept in memory to answer
+    # aggregate queries. Results are kept in an LRU cache of cache_size
+    # queries. refresh reads only the files that changed and drops only the
+    # cached results that have one of their reports. Queries wait on lock
+    # only while refresh swaps in the new reports, not while it reads them.
+    # cache_dir is where parsed reports are cached, see open_parse_cache,
+    # manifest_path where the manifest is saved, see make_manifest, and
+    # decimal the decimal separator of text costs, see parse_report.
+    def __init__(
+        self,
+        input_dir_path,
+        workers=1,
+        use_cache=True,
+        cache_size=256,
+        cache_dir=None,
+        manifest_path=None,
+        decimal=None,
+    ):
+        self.input_dir_path = input_dir_path
+        self.workers = workers
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.manifest_path = manifest_path
+        self.decimal = decimal
+        self.cache_size = cache_size
+        self.lock = threading.Lock()  # Reports, results and counters
+        self.refresh_lock = threading.Lock()  # One refresh at a time
+        self.results = OrderedDict()  # query key: result, oldest first
+        self.hits = 0
+        self.misses = 0
+        self.error = None  # Of the last refresh, the old reports are kept then
+
+        self.files = {}  # file: manifest entry
+        self.reports = {}  # file: parsed report
+        self.store = BudgetStore()
+        self.refresh()
+        if self.error is not None:
+            raise Exception(self.error)
+
+    # ------------------------------------------------------------------------------------------------------------
+    #           Load Data
+    # ------------------------------------------------------------------------------------------------------------
+
+    # Read new and changed files, forget removed ones and drop the cached
+    # results they change. Returns the files that changed. files, reports
+    # and store are only replaced here, so refresh reads them without lock.
+    def refresh(self) -> dict:
+        with self.refresh_lock:
+            try:
+                files = make_manifest(
+                    self.input_dir_path, self.workers, self.manifest_path
+                )["files"]
+            except Exception as error:
+                return self.refresh_failed([], [], error)
+            changed = sorted(
+                file
+                for file, entry in files.items()
+                if self.files.get(file) is None
+                or (self.files[file]["size"], self.files[file]["mtime"])
+                != (entry["size"], entry["mtime"])
+            )
+            removed = sorted(set(self.files) - set(files))
+            if not changed and not removed:
+                with self.lock:
+                    self.error = None  # The files are back to the loaded ones
+                return {"changed": [], "removed": [], "invalidated": 0}
+
+            # The new store is made before anything is replaced, so a file
+            # that cannot be read or a duplicate leaves the service as it was
+            reports = dict(self.reports)
+            for file in removed:
+                del reports[file]
+            store = BudgetStore()
+            try:
+                reports.update(zip(changed, self.parse_files(changed, files)))
+                # In folder order like AutoBudget, so a summary of the store
+                # has its cost types in the same rows as one built from files
+                for file in files:
+                    store.add(*reports[file])
+            except Exception as error:
+                return self.refresh_failed(changed, removed, error)
+            store.finish()
+
+            # Reports that were there before the change or are there after it
+            touched = {
+                tuple(self.reports[file][:2])
+                for file in removed + changed
+                if file in self.reports
+            }
+            touched |= {tuple(reports[file][:2]) for file in changed}
+            with self.lock:
+                invalidated = self.invalidate(touched)
+                self.files = files
+                self.reports = reports
+                self.store = store
+                self.error = None
+            return {"changed": changed, "removed": removed, "invalidated": invalidated}
+
+    def refresh_failed(self, changed, removed, error) -> dict:
+        with self.lock:
+            self.error = str(error)
+        return {"changed": changed, "removed": removed, "error": str(error)}
+
+    def parse_files(self, files, entries) -> list:
+        file_paths = [os.path.join(self.input_dir_path, file) for file in files]
+        marker_rows = [entries[file]["marker_rows"] for file in files]
+        cache = None
+        if self.use_cache:
+            cache = open_parse_cache(self.input_dir_path, self.cache_dir, self.decimal)
+        reports = [None] * len(files)
+        parse_indices = []
+        for i, file_path in enumerate(file_paths):
+            if cache is not None:
+                reports[i] = cache.get(file_path)
+            if reports[i] is None:
+                parse_indices.append(i)
+
+        parse = partial(parse_report, decimal=self.decimal)
+        parse_paths = [file_paths[i] for i in parse_indices]
+        parse_rows = [marker_rows[i] for i in parse_indices]
+        if self.workers > 1 and len(parse_paths) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                chunksize = max(1, len(parse_paths) // (self.workers * 4))
+                parsed = list(
+                    executor.map(parse, parse_paths, parse_rows, chunksize=chunksize)
+                )
+        else:
+            parsed = list(map(parse, parse_paths, parse_rows))
+        for i, report in zip(parse_indices, parsed):
+            reports[i] = report
+            if cache is not None:
+                cache.put(file_paths[i], report)
+        if cache is not None:
+            cache.save()
+        return reports
+
+    # ------------------------------------------------------------------------------------------------------------
+    #           Queries
+    # ------------------------------------------------------------------------------------------------------------
+
+    # Actual, planned and planned - actual summed over the reports matching
+    # every filter given, empty cells count as 0. A filter is a collection of
+    # periods, cost centers or cost types, ytd a period like "006.2021" for
+    # every month of its year up to it. by breaks the sums down by period,
+    # cost center or cost type.
+    def query(
+        self, periods=None, cost_centers=None, cost_types=None, ytd=None, by=None
+    ) -> dict:
+        if ytd is not None:
+            if periods is not None:
+                raise Exception("give either periods or ytd, not both")
+            periods = year_to_date(ytd)
+        if by is not None and by not in GROUP_BY:
+            raise Exception(f"by is {by}, it should be one of {', '.join(GROUP_BY)}")
+        key = (
+            None if periods is None else frozenset(periods),
+            None if cost_centers is None else frozenset(cost_centers),
+            None if cost_types is None else frozenset(cost_types),
+            by,
+        )
+
+        with self.lock:
+            result = self.results.get(key)
+            if result is not None:
+                self.hits += 1
+                self.results.move_to_end(key)
+                return result
+            self.misses += 1
+            store = self.store
+
+        # Summed without lock, so queries do not wait on each other, and only
+        # kept if refresh did not swap in new reports meanwhile
+        result = self.aggregate(store, *key)
+        with self.lock:
+            if self.store is store:
+                self.results[key] = result
+                if len(self.results) > self.cache_size:
+                    self.results.popitem(last=False)
+        return result
+
+    def aggregate(self, store, periods, cost_centers, cost_types, by) -> dict:
+        arrays = store.arrays()
+        keep = np.ones(store.n_rows, dtype=bool)
+        for column, codes, names in (
+            ("period", store.periods, periods),
+            ("cost_center", store.cost_centers, cost_centers),
+            ("cost_type", store.cost_types, cost_types),
+        ):
+            if names is not None:
+                keep &= np.isin(
+                    arrays[column], [codes[name] for name in names if name in codes]
+                )
+        values = np.nan_to_num(arrays["values"][keep])
+        actual = float(values[:, 0].sum())
+        planned = float(values[:, 1].sum())
+        result = {
+            "actual": actual,
+            "planned": planned,
+            "diff": planned - actual,
+            "rows": int(keep.sum()),
+        }
+
+        if by is not None:
+            names = list(getattr(store, GROUP_BY[by]))
+            group_codes = arrays[by][keep]
+            group_actual = np.bincount(
+                group_codes, weights=values[:, 0], minlength=len(names)
+            )
+            group_planned = np.bincount(
+                group_codes, weights=values[:, 1], minlength=len(names)
+            )
+            result["groups"] = {
+                names[code]: {
+                    "actual": float(group_actual[code]),
+                    "planned": float(group_planned[code]),
+                    "diff": float(group_planned[code] - group_actual[code]),
+                }
+                for code in np.unique(group_codes)
+            }
+        return result
+
+    # Drop the cached results that sum any of the (period, cost center)
+    # reports, returns how many
+    def invalidate(self, reports) -> int:
+        stale = [
+            key
+            for key in self.results
+            if any(
+                (key[0] is None or period in key[0])
+                and (key[1] is None or cost_center in key[1])
+                for period, cost_center in reports
+            )
+        ]
+        for key in stale:
+            del self.results[key]
+        return len(stale)
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "files": len(self.files),
+                "reports": len(self.store),
+                "periods": sorted(self.store.periods),
+                "cost_centers": sorted(self.store.cost_centers),
+                "cost_types": len(self.store.cost_types),
+                "cached_results": len(self.results),
+                "hits": self.hits,
+                "misses": self.misses,
+                "error": self.error,
+            }
+
+
+# Every period of the year of period up to it, "003.2021" is 001.2021,
+# 002.2021 and 003.2021
+def year_to_date(period) -> list:
+    month, _, year = period.partition(".")
+    if not (month.isdigit() and year.isdigit()):
+        raise Exception(f"ytd is {period}, it should be a period like 006.2021")
+    return [f"{i_month:03d}.{year}" for i_month in range(1, int(month) + 1)]
+
+
+# ------------------------------------------------------------------------------------------------------------
+#           HTTP
+# ------------------------------------------------------------------------------------------------------------
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    # GET /query?cost_type=..&cost_center=..&ytd=..&by=.., filters can be
+    # repeated or comma separated. GET /status, POST /refresh. Answers are JSON.
+    service = None  # Set by make_server
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/status":
+            self.answer(200, self.service.status())
+        elif url.path == "/query":
+            params = parse_qs(url.query)
+
+            def names(name):
+                if name not in params:
+                    return None
+                return [
+                    value.strip()
+                    for values in params[name]
+                    for value in values.split(",")
+                    if value.strip()
+                ]
+
+            try:
+                result = self.service.query(
+                    periods=names("period"),
+                    cost_centers=names("cost_center"),
+                    cost_types=names("cost_type"),
+                    ytd=params.get("ytd", [None])[-1],
+                    by=params.get("by", [None])[-1],
+                )
+            except Exception as error:
+                self.answer(400, {"error": str(error)})
+                return
+            self.answer(200, result)
+        else:
+            self.answer(404, {"error": f"no such path {url.path}"})
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path == "/refresh":
+            self.answer(200, self.service.refresh())
+        else:
+            self.answer(404, {"error": f"no such path {self.path}"})
+
+    def answer(self, status, body) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix socket"
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self) -> None:
+        # HTTPServer looks up a host name, there is none for a socket file
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+# HTTP server answering from service, on host and port or, if given, on the
+# Unix socket socket_path
+def make_server(service, host="127.0.0.1", port=8765, socket_path=None):
+    handler = type("Handler", (QueryHandler,), {"service": service})
+    if socket_path is not None:
+        remove_socket(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# Remove the socket file at socket_path, left by an earlier server. Anything
+# else there is an error, so a mistyped path never removes a file.
+def remove_socket(socket_path) -> None:
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise Exception(f"{socket_path} is not a socket, it is left as it is")
+    os.remove(socket_path)
+
+
+# Call service.refresh every interval seconds until stop is set
+def poll_changes(service, interval, stop) -> None:
+    last_error = None
+    while not stop.wait(interval):
+        result = service.refresh()
+        if "error" in result:
+            if result["error"] != last_error:
+                print(f"Could not reload the reports: {result['error']}")
+            last_error = result["error"]
+        elif result["changed"] or result["removed"]:
+            print(
+                f"Reloaded {len(result['changed'])} changed and {len(result['removed'])} removed files, "
+                f"{result['invalidated']} cached results dropped"
+            )
+            last_error = None
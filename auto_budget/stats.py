@@ -0,0 +1,130 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows, peak memory is then left out of the run report
+    resource = None
+
+
+# Largest resident set of this process and of its finished worker processes
+def peak_rss_mib() -> dict:
+    if resource is None:
+        return {}
+    unit = 1024**2 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS
+    return {
+        "main": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 1024**2,
+        "workers": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        * unit
+        / 1024**2,
+    }
+
+
+class RunStats:
+    # Where the time and memory of a run go: seconds and calls per stage,
+    # seconds per parsed input file, cell and style counts and peak memory.
+    # trace_memory adds the peak Python allocations of every stage and
+    # profile a cProfile capture of the whole run, both slow the run down.
+    def __init__(
+        self, report_path=None, profile=False, trace_memory=False, top_functions=30
+    ) -> None:
+        self.report_path = report_path
+        self.trace_memory = trace_memory
+        self.top_functions = top_functions
+        self.profiler = cProfile.Profile() if profile else None
+        self.stages = {}
+        self.files = {}
+        self.counts = {}
+        self.started = None
+        self.start_time = None
+        self.seconds = None
+
+    def start(self) -> None:
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.start_time = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    @contextmanager
+    def stage(self, name):
+        stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            traced_start, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage["seconds"] += time.perf_counter() - start
+            stage["calls"] += 1
+            if self.trace_memory:
+                _, traced_peak = tracemalloc.get_traced_memory()
+                stage["peak_traced_mib"] = max(
+                    stage.get("peak_traced_mib", 0),
+                    (traced_peak - traced_start) / 1024**2,
+                )
+
+    def add_file(self, file_path, seconds) -> None:
+        self.files[file_path] = seconds
+
+    def count(self, name, n=1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    # The slowest functions of the cProfile capture, by cumulative time
+    def profile_summary(self) -> list:
+        profile_stats = pstats.Stats(self.profiler).stats
+        functions = sorted(
+            profile_stats.items(), key=lambda item: item[1][3], reverse=True
+        )
+        return [
+            {
+                "function": f"{file}:{line}({name})",
+                "calls": calls,
+                "seconds": total_time,
+                "cumulative_seconds": cumulative_time,
+            }
+            for (file, line, name), (
+                _,
+                calls,
+                total_time,
+                cumulative_time,
+                _,
+            ) in functions[: self.top_functions]
+        ]
+
+    # Stop measuring and write the report to report_path if there is one.
+    # The raw capture goes next to it as .prof, for snakeviz or pstats.
+    def finish(self) -> dict:
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.trace_memory:
+            tracemalloc.stop()
+        self.seconds = time.perf_counter() - self.start_time
+
+        report = {
+            "started": self.started,
+            "seconds": self.seconds,
+            "stages": self.stages,
+            "files": self.files,
+            "counts": self.counts,
+            "peak_rss_mib": peak_rss_mib(),
+        }
+        if self.profiler is not None:
+            report["profile"] = self.profile_summary()
+
+        if self.report_path is not None:
+            with open(self.report_path, "w") as f:
+                json.dump(report, f, indent=1)
+            if self.profiler is not None:
+                self.profiler.dump_stats(
+                    os.path.splitext(self.report_path)[0] + ".prof"
+                )
+        return report
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+
+class BudgetStore:
+    # Every loaded report in a few flat arrays, one row per report and cost
+    # type. Periods, cost centers, Cost Center Nodes and cost types are
+    # interned to integer codes in the order they are first added, costs are
+    # floats with NaN for empty cells. store[period, cost_center] gives back
+    # one report.
+    def __init__(self) -> None:
+        self.periods = {}  # period: code
+        self.cost_centers = {}  # cost center: code
+        self.cost_types = {}  # cost type: code
+        self.nodes = {}  # Cost Center Node: code
+        self.reports = {}  # (period, cost_center): rows of the report
+        self.n_rows = 0
+        self._chunks = []
+        self._arrays = None
+
+    def intern(self, codes, name) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(codes)
+        return code
+
+    # node is the whole Cost Center Node, the cost center if not given
+    def add(self, period, cost_center, cost_types, values, node=None) -> None:
+        if (period, cost_center) in self.reports:
+            raise Exception(
+                f"cost center {cost_center} has a dublicate with the date {period}, please remove it!"
+            )
+        period_code = self.intern(self.periods, period)
+        center_code = self.intern(self.cost_centers, cost_center)
+        node_code = self.intern(self.nodes, cost_center if node is None else node)
+        type_codes = np.array(
+            [self.intern(self.cost_types, cost_type) for cost_type in cost_types],
+            dtype=np.int32,
+        )
+        self.reports[(period, cost_center)] = slice(
+            self.n_rows, self.n_rows + len(type_codes)
+        )
+        self.n_rows += len(type_codes)
+        self._chunks.append(
+            {
+                "period": np.full(len(type_codes), period_code, dtype=np.int32),
+                "cost_center": np.full(len(type_codes), center_code, dtype=np.int32),
+                "node": np.full(len(type_codes), node_code, dtype=np.int32),
+                "cost_type": type_codes,
+                "values": np.asarray(values, dtype=float).reshape(-1, 2),
+            }
+        )
+        self._arrays = None
+
+    # The reports added so far as one array per column, joined on first use
+    def arrays(self) -> dict:
+        if self._arrays is None:
+            empty = {
+                "period": np.empty(0, dtype=np.int32),
+                "cost_center": np.empty(0, dtype=np.int32),
+                "node": np.empty(0, dtype=np.int32),
+                "cost_type": np.empty(0, dtype=np.int32),
+                "values": np.empty((0, 2)),
+            }
+            self._arrays = {
+                column: np.concatenate(
+                    [chunk[column] for chunk in self._chunks] + [empty[column]]
+                )
+                for column in empty
+            }
+            self._chunks = [self._arrays]
+        return self._arrays
+
+    def finish(self) -> None:
+        self.arrays()
+
+    # A new store with only the reports of the given cost centers, added in
+    # the same order, as if only their files had been loaded
+    def select(self, cost_centers) -> "BudgetStore":
+        arrays = self.arrays()
+        names = list(self.cost_types)
+        nodes = list(self.nodes)
+        cost_centers = set(cost_centers)
+        store = BudgetStore()
+        for (period, cost_center), rows in self.reports.items():
+            if cost_center in cost_centers:
+                store.add(
+                    period,
+                    cost_center,
+                    [names[code] for code in arrays["cost_type"][rows]],
+                    arrays["values"][rows],
+                    (
+                        nodes[arrays["node"][rows.start]]
+                        if rows.stop > rows.start
+                        else None
+                    ),
+                )
+        store.finish()
+        return store
+
+    # Year of the latest period loaded, like "2021", "" without reports. The
+    # summary and projections are of this year.
+    def latest_year(self) -> str:
+        return max((period[4:] for period in self.periods), default="")
+
+    # Cost types in the order they first show up when the reports are read a
+    # period at a time, the order of the rows in the summary
+    def cost_types_by_period(self) -> list:
+        arrays = self.arrays()
+        order = np.argsort(arrays["period"], kind="stable")
+        type_codes = arrays["cost_type"][order]
+        _, first = np.unique(type_codes, return_index=True)
+        names = list(self.cost_types)
+        return [names[code] for code in type_codes[np.sort(first)]]
+
+    # Period and cost type codes with their actual and planned sums, empty
+    # cells count as 0
+    def month_totals(self) -> tuple:
+        month_costs = (
+            self.frame()
+            .groupby(["period", "cost_type"], sort=False)[["actual", "planned"]]
+            .sum()
+        )
+        return (
+            month_costs.index.get_level_values("period").to_numpy(dtype=int),
+            month_costs.index.get_level_values("cost_type").to_numpy(dtype=int),
+            month_costs["actual"].to_numpy(),
+            month_costs["planned"].to_numpy(),
+        )
+
+    # Period, cost center and cost type codes of every actual cost that is
+    # not empty or 0, with the cost
+    def center_actuals(self) -> tuple:
+        arrays = self.arrays()
+        actual = arrays["values"][:, 0]
+        has_cost = ~np.isnan(actual) & (actual != 0)
+        return (
+            arrays["period"][has_cost],
+            arrays["cost_center"][has_cost],
+            arrays["cost_type"][has_cost],
+            actual[has_cost],
+        )
+
+    # Codes and costs of every row, actual and planned as separate columns
+    def frame(self) -> pd.DataFrame:
+        arrays = self.arrays()
+        return pd.DataFrame(
+            {
+                "period": arrays["period"],
+                "cost_center": arrays["cost_center"],
+                "cost_type": arrays["cost_type"],
+                "actual": arrays["values"][:, 0],
+                "planned": arrays["values"][:, 1],
+            }
+        )
+
+    def __getitem__(self, key) -> pd.DataFrame:
+        rows = self.reports[key]
+        arrays = self.arrays()
+        cost_types = list(self.cost_types)
+        return pd.DataFrame(
+            arrays["values"][rows],
+            index=pd.Index(
+                [cost_types[code] for code in arrays["cost_type"][rows]],
+                name="Cost Type",
+            ),
+            columns=["Actual", "Planned"],
+        )
+
+    def __contains__(self, key) -> bool:
+        return key in self.reports
+
+    def __iter__(self):
+        return iter(self.reports)
+
+    def __len__(self) -> int:
+        return len(self.reports)
@@ -0,0 +1,63 @@
+from copy import copy
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from dataclasses import dataclass
+
+
+@dataclass
+class Style:
+    # Styles
+    FONT_BIG_BOLD = Font(name="Arial", bold=True, size=13)
+    FONT_SMALL_BOLD = Font(name="Arial", bold=True, size=11)
+    FONT_STANDARD = Font(name="Arial")
+    COLOR_YELLOW_1 = PatternFill(fgColor="e0d8c1", fill_type="solid")
+    COLOR_YELLOW_2 = PatternFill(fgColor="e6e1d2", fill_type="solid")
+    COLOR_YELLOW_3 = PatternFill(fgColor="eceae4", fill_type="solid")
+    COLOR_BLUE_1 = PatternFill(fgColor="c1c9e0", fill_type="solid")
+    COLOR_BLUE_2 = PatternFill(fgColor="d2d7e6", fill_type="solid")
+    COLOR_BLUE_3 = PatternFill(fgColor="e4e6ec", fill_type="solid")
+
+    BORDER_DOTTED = Border(
+        left=Side(border_style="dotted", color="000000"),
+        # right=Side(border_style='thin', color='CDCDCD'),
+        top=Side(border_style="dotted", color="000000"),
+        # bottom=Side(border_style='thin', color='CDCDCD')
+    )
+    SIDE_THICK = Side(border_style="thick", color="000000")
+
+    # Numbers use the built in named style, right aligned
+    NUMBER_STYLE = "Comma [0]"
+    ALIGNMENT_RIGHT = Alignment(horizontal="right")
+
+
+class CellStyle:
+    # Final style of a cell, worked out once by AutoBudget.style_sheet
+    __slots__ = ("named_style", "font", "fill", "border", "alignment")
+
+    def __init__(
+        self, named_style=None, font=None, fill=None, border=None, alignment=None
+    ) -> None:
+        self.named_style = named_style
+        self.font = font
+        self.fill = fill
+        self.border = border
+        self.alignment = alignment
+
+    # Cells with the same CellStyle share one StyleArray, so after the first
+    # cell every other one is styled with a single assignment
+    def apply(self, cell, style_arrays) -> None:
+        style_array = style_arrays.get(self)
+        if style_array is not None:
+            cell._style = copy(style_array)
+            return
+
+        if self.named_style is not None:
+            cell.style = self.named_style
+        if self.font is not None:
+            cell.font = self.font
+        if self.fill is not None:
+            cell.fill = self.fill
+        if self.border is not None:
+            cell.border = self.border
+        if self.alignment is not None:
+            cell.alignment = self.alignment
+        style_arrays[self] = copy(cell._style)
@@ -0,0 +1,165 @@
+import numpy as np
+
+
+# array grown to at least shape, at least doubling every axis that is too
+# small so growing one report at a time stays cheap
+def grown(array, shape, fill) -> np.ndarray:
+    if all(need <= have for need, have in zip(shape, array.shape)):
+        return array
+    capacity = (
+        tuple(
+            max(need, 2 * have) if need > have else have
+            for need, have in zip(shape, array.shape)
+        )
+        + array.shape[len(shape) :]
+    )
+    new_array = np.full(capacity, fill, dtype=array.dtype)
+    new_array[tuple(slice(0, have) for have in array.shape)] = array
+    return new_array
+
+
+class RunningTotals:
+    # Only the totals the summary needs, folded in one report at a time so the
+    # reports themselves can be dropped: actual and planned sums per period and
+    # cost type, and the actual cost per period, cost center and cost type.
+    # Sums use the same compensated (Kahan) summation as a pandas groupby sum,
+    # so they match BudgetStore to the last bit.
+    def __init__(self) -> None:
+        self.periods = {}  # period: code
+        self.cost_centers = {}  # cost center: code
+        self.cost_types = {}  # cost type: code
+        self.nodes = {}  # Cost Center Node: code
+        self.reports = set()
+        self.n_rows = 0
+        self.month_sums = np.zeros((0, 0, 2))  # period, cost type, actual/planned
+        self.compensation = np.zeros((0, 0, 2))
+        self.center_actual = np.full((0, 0, 0), np.nan)  # period, cost center, type
+        self.first_seen = np.zeros((0, 2), dtype=np.int64)  # period, row of type
+
+    def intern(self, codes, name) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(codes)
+        return code
+
+    def add(self, period, cost_center, cost_types, values, node=None) -> None:
+        if (period, cost_center) in self.reports:
+            raise Exception(
+                f"cost center {cost_center} has a dublicate with the date {period}, please remove it!"
+            )
+        self.reports.add((period, cost_center))
+        period_code = self.intern(self.periods, period)
+        center_code = self.intern(self.cost_centers, cost_center)
+        self.intern(self.nodes, cost_center if node is None else node)
+        type_codes = np.array(
+            [self.intern(self.cost_types, cost_type) for cost_type in cost_types],
+            dtype=np.int64,
+        )
+        values = np.asarray(values, dtype=float).reshape(-1, 2)
+
+        n_periods = len(self.periods)
+        n_types = len(self.cost_types)
+        self.month_sums = grown(self.month_sums, (n_periods, n_types), 0.0)
+        self.compensation = grown(self.compensation, (n_periods, n_types), 0.0)
+        self.center_actual = grown(
+            self.center_actual, (n_periods, len(self.cost_centers), n_types), np.nan
+        )
+        first_seen = grown(self.first_seen, (n_types,), np.iinfo(np.int64).max)
+
+        # Where every cost type first shows up, taking a period at a time
+        unique_codes, first_rows = np.unique(type_codes, return_index=True)
+        earlier = period_code < first_seen[unique_codes, 0]
+        first_seen[unique_codes[earlier], 0] = period_code
+        first_seen[unique_codes[earlier], 1] = self.n_rows + first_rows[earlier]
+        self.first_seen = first_seen
+        self.n_rows += len(type_codes)
+
+        # Rows with the same cost type are folded one after the other
+        if len(unique_codes) == len(type_codes):
+            self.fold(period_code, center_code, type_codes, values)
+        else:
+            for i_row in range(len(type_codes)):
+                self.fold(
+                    period_code,
+                    center_code,
+                    type_codes[i_row : i_row + 1],
+                    values[i_row : i_row + 1],
+                )
+
+    def fold(self, period_code, center_code, type_codes, values) -> None:
+        sums = self.month_sums[period_code, type_codes]
+        compensation = self.compensation[period_code, type_codes]
+        has_value = ~np.isnan(values)
+        y = values - compensation
+        t = sums + y
+        new_compensation = t - sums - y
+        new_compensation[np.isnan(new_compensation)] = 0  # Infinite costs
+        self.month_sums[period_code, type_codes] = np.where(has_value, t, sums)
+        self.compensation[period_code, type_codes] = np.where(
+            has_value, new_compensation, compensation
+        )
+
+        actual = values[:, 0]
+        has_cost = has_value[:, 0] & (actual != 0)
+        self.center_actual[period_code, center_code, type_codes[has_cost]] = actual[
+            has_cost
+        ]
+
+    # Drop the spare capacity once every report is in
+    def finish(self) -> None:
+        n_periods = len(self.periods)
+        n_types = len(self.cost_types)
+        self.month_sums = self.month_sums[:n_periods, :n_types].copy()
+        self.compensation = self.compensation[:n_periods, :n_types].copy()
+        self.center_actual = self.center_actual[
+            :n_periods, : len(self.cost_centers), :n_types
+        ].copy()
+        self.first_seen = self.first_seen[:n_types].copy()
+
+    # Year of the latest period loaded, like "2021", "" without reports. The
+    # summary and projections are of this year.
+    def latest_year(self) -> str:
+        return max((period[4:] for period in self.periods), default="")
+
+    # Cost types in the order they first show up when the reports are read a
+    # period at a time, the order of the rows in the summary
+    def cost_types_by_period(self) -> list:
+        n_types = len(self.cost_types)
+        first_seen = self.first_seen[:n_types]
+        order = np.lexsort((first_seen[:, 1], first_seen[:, 0]))
+        names = list(self.cost_types)
+        return [names[code] for code in order]
+
+    # Period and cost type codes with their actual and planned sums
+    def month_totals(self) -> tuple:
+        sums = self.month_sums[: len(self.periods), : len(self.cost_types)]
+        period_codes, type_codes = np.indices(sums.shape[:2])
+        return (
+            period_codes.ravel(),
+            type_codes.ravel(),
+            sums[:, :, 0].ravel(),
+            sums[:, :, 1].ravel(),
+        )
+
+    # Period, cost center and cost type codes of every actual cost that is
+    # not empty or 0, with the cost
+    def center_actuals(self) -> tuple:
+        actual = self.center_actual[
+            : len(self.periods), : len(self.cost_centers), : len(self.cost_types)
+        ]
+        period_codes, center_codes, type_codes = np.nonzero(~np.isnan(actual))
+        return (
+            period_codes,
+            center_codes,
+            type_codes,
+            actual[period_codes, center_codes, type_codes],
+        )
+
+    def __contains__(self, key) -> bool:
+        return key in self.reports
+
+    def __iter__(self):
+        return iter(self.reports)
+
+    def __len__(self) -> int:
+        return len(self.reports)
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from datetime import date
+from .budget import AutoBudget
+from .reports import is_cost_report
+from .service import BudgetService
+
+
+# Size and modification time of every report in input_dir_path
+def snapshot(input_dir_path) -> dict:
+    files = {}
+    for file in os.listdir(input_dir_path):
+        if is_cost_report(file):
+            try:
+                stat = os.stat(os.path.join(input_dir_path, file))
+            except FileNotFoundError:
+                continue  # Removed while listing
+            files[file] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+class SummaryWatcher:
+    # Keeps the parsed reports of input_dir_path in memory and saves the
+    # summary again whenever reports are added, changed or removed. Files
+    # usually come in bursts, so the folder has to stay unchanged for
+    # debounce seconds before the whole batch is read, only the files that
+    # changed are parsed. options are the AutoBudget options of the summary,
+    # write_only and formula_mode.
+    def __init__(
+        self,
+        input_dir_path,
+        output_path=None,
+        workers=1,
+        use_cache=True,
+        cache_dir=None,
+        manifest_path=None,
+        decimal=None,
+        interval=1.0,
+        debounce=5.0,
+        shard_size=None,
+        **options,
+    ) -> None:
+        self.input_dir_path = input_dir_path
+        self.output_path = output_path
+        self.workers = workers
+        self.interval = interval
+        self.debounce = debounce
+        self.shard_size = shard_size
+        self.options = options
+        self.service = BudgetService(
+            input_dir_path,
+            workers,
+            use_cache,
+            cache_dir=cache_dir,
+            manifest_path=manifest_path,
+            decimal=decimal,
+        )
+
+    # Save the summary of the reports in memory, returns the saved paths
+    def render(self) -> list:
+        if not self.service.store:
+            print("No reports yet, nothing to save")
+            return []
+        budget = AutoBudget(None, budgets=self.service.store, **self.options)
+        output_path = self.output_path
+        if output_path is None:
+            output_path = (
+                f"Cost Report Summary {date.today()} ({budget.get_cost_centers()}).xlsx"
+            )
+        try:
+            if budget.needs_shards(self.shard_size):
+                paths = budget.save_shards(output_path, self.shard_size, self.workers)
+                return list(paths.values())
+
+            budget.make_compilation()
+            budget.save(output_path)
+            return [output_path]
+        except BaseException:
+            budget.discard()
+            raise
+
+    # Save the summary, then watch the folder until stop is set. The folder
+    # is compared to the files the service read, so files dropped while it
+    # was loading or saving are read too.
+    def run(self, stop=None) -> None:
+        stop = stop or threading.Event()
+        self.report_render()
+        tried = {
+            file: (entry["size"], entry["mtime"])
+            for file, entry in self.service.files.items()
+        }  # The files last read, or tried to
+        seen = None  # The folder as last seen
+        changed_at = None  # Last time it was seen changing
+        while not stop.wait(self.interval):
+            current = snapshot(self.input_dir_path)
+            if current != seen:
+                seen = current
+                changed_at = time.monotonic()
+                continue
+            if current == tried or time.monotonic() - changed_at < self.debounce:
+                continue
+
+            # The folder settled, read the batch
+            tried = current
+            result = self.service.refresh()
+            if "error" in result:
+                print(f"Could not read the reports: {result['error']}")
+                continue
+            if result["changed"] or result["removed"]:
+                print(
+                    f"Read {len(result['changed'])} changed and {len(result['removed'])} removed files"
+                )
+                self.report_render()
+
+    # Save the summary and print where. An error is printed and the watcher
+    # goes on, the summary is saved again when the reports change next.
+    def report_render(self) -> None:
+        start = time.perf_counter()
+        try:
+            paths = self.render()
+        except Exception as error:
+            print(f"Could not save the summary: {error}")
+            return
+        for path in paths:
+            print(f"Saved {path}")
+        if paths:
+            print(f"Summary saved in {time.perf_counter() - start:.1f} s")
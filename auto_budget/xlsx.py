@@ -0,0 +1,38 @@
+import math
+import os
+import re
+import zipfile
+from openpyxl.utils import get_column_letter
+
+# A formula cell as openpyxl writes it, with an empty cached value
+FORMULA_CELL = re.compile(rb'(<c r="([A-Z]+[0-9]+)"[^>]*>\s*<f>[^<]*</f>)\s*<v\s*/>')
+
+
+# Put the values of formula cells into a saved workbook, so programs that do
+# not calculate formulas can read them. openpyxl can only write the formula.
+# sheet_index is the position of the sheet, cached_values maps (row, col) to
+# the number the formula works out to.
+def add_cached_values(path, sheet_index, cached_values) -> None:
+    values = {
+        f"{get_column_letter(col)}{row}".encode(): repr(float(value)).encode()
+        for (row, col), value in cached_values.items()
+        if value is not None and math.isfinite(value)
+    }
+
+    def cache_value(match):
+        value = values.get(match.group(2))
+        if value is None:
+            return match.group(0)
+        return match.group(1) + b"<v>" + value + b"</v>"
+
+    sheet_name = f"xl/worksheets/sheet{sheet_index + 1}.xml"
+    with (
+        zipfile.ZipFile(path) as source,
+        zipfile.ZipFile(path + ".tmp", "w", zipfile.ZIP_DEFLATED) as target,
+    ):
+        for item in source.infolist():
+            data = source.read(item)
+            if item.filename == sheet_name:
+                data = FORMULA_CELL.sub(cache_value, data)
+            target.writestr(item, data)
+    os.replace(path + ".tmp", path)
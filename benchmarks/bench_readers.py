@@ -0,0 +1,143 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import openpyxl
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARK_DIR.parent))  # Run from a checkout
+import auto_budget  # noqa: E402
+from auto_budget.reports import SHEET_NAME, read_xlrd  # noqa: E402
+
+REFERENCE_ENGINE = "xlrd"
+
+
+# A number the way a Swedish export writes it, like "-1 234,5", with every
+# digit of the float kept
+def swedish_number(value) -> str:
+    text = repr(value)
+    if not text.lstrip("-")[:1].isdigit() or "e" in text:
+        return text  # inf, nan and exponents stay as Python writes them
+    integer, _, fraction = text.partition(".")
+    digits = integer.lstrip("-")
+    groups = []
+    while digits:
+        groups.insert(0, digits[-3:])
+        digits = digits[:-3]
+    sign = "-" if integer.startswith("-") else ""
+    return sign + " ".join(groups) + ("," + fraction if fraction else "")
+
+
+# The report sheet of every .XLS file saved again as .xlsx, as CSV and as CSV
+# with Swedish numbers, the ways the ERP exports them
+def convert_reports(input_dir, output_dir) -> dict:
+    converted = {".XLS": [], ".xlsx": [], ".csv": [], ".csv (sv)": []}
+    for file in sorted(os.listdir(input_dir)):
+        if not file.endswith(".XLS"):
+            continue
+        file_path = os.path.join(input_dir, file)
+        with read_xlrd(file_path) as sheet:
+            rows = [sheet.row_values(row) for row in range(sheet.nrows)]
+        name = os.path.splitext(file)[0]
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = SHEET_NAME
+        for row in rows:
+            ws.append([None if value == "" else value for value in row])
+        xlsx_path = os.path.join(output_dir, name + ".xlsx")
+        wb.save(xlsx_path)
+
+        csv_path = os.path.join(output_dir, name + ".csv")
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f, delimiter=";").writerows(rows)
+
+        sv_path = os.path.join(output_dir, name + ".sv.csv")
+        with open(sv_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f, delimiter=";").writerows(
+                [
+                    swedish_number(value) if isinstance(value, float) else value
+                    for value in row
+                ]
+                for row in rows
+            )
+
+        converted[".XLS"].append(file_path)
+        converted[".xlsx"].append(xlsx_path)
+        converted[".csv"].append(csv_path)
+        converted[".csv (sv)"].append(sv_path)
+    return converted
+
+
+def same_report(expected, actual) -> bool:
+    return (
+        expected[:3] == actual[:3]
+        and expected[4] == actual[4]
+        and expected[3].shape == actual[3].shape
+        and np.array_equal(expected[3], actual[3], equal_nan=True)
+    )
+
+
+# Best of repeat timings of parsing every file with engine, and whether every
+# report is the same as the xlrd one of its .XLS file
+def bench_engine(file_paths, references, engine, repeat) -> tuple:
+    best = None
+    identical = True
+    for _ in range(repeat):
+        auto_budget.layout_cache.clear()
+        start = time.perf_counter()
+        reports = [
+            auto_budget.parse_report(file_path, engine=engine)
+            for file_path in file_paths
+        ]
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+        identical &= all(
+            same_report(reference, report)
+            for reference, report in zip(references, reports)
+        )
+    return best, identical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare every report reader to xlrd, for speed and parse results"
+    )
+    parser.add_argument(
+        "input_dir",
+        nargs="?",
+        default=str(BENCHMARK_DIR.parent / "dummydata"),
+        help="folder with .XLS reports (default: dummydata)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="best of N timings")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        converted = convert_reports(args.input_dir, tmp_dir)
+        references = [
+            auto_budget.parse_report(file_path, engine=REFERENCE_ENGINE)
+            for file_path in converted[".XLS"]
+        ]
+        reference_seconds, _ = bench_engine(
+            converted[".XLS"], references, REFERENCE_ENGINE, args.repeat
+        )
+        print(f"{len(references)} reports, {args.repeat} runs each\n")
+        print(f"  {'file':<12}{'engine':<12}{'seconds':>10}{'speedup':>10}  identical")
+        for extension, file_paths in converted.items():
+            if not file_paths:
+                continue
+            for engine in auto_budget.available_engines(file_paths[0]):
+                seconds, identical = bench_engine(
+                    file_paths, references, engine, args.repeat
+                )
+                failed |= not identical
+                print(
+                    f"  {extension:<12}{engine:<12}{seconds:10.4f}"
+                    f"{reference_seconds / seconds:10.2f}  {'yes' if identical else 'NO'}"
+                )
+    sys.exit(1 if failed else 0)
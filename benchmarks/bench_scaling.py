@@ -0,0 +1,201 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+import numpy as np
+from compare_workbooks import compare_workbooks
+from make_reports import make_reports
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARK_DIR.parent))  # Run from a checkout
+import auto_budget  # noqa: E402
+
+DATA_DIR = BENCHMARK_DIR / ".data"
+GOLDEN_DIR = BENCHMARK_DIR / ".golden"
+STAGES = ["load", "aggregation", "compilation", "styling", "save", "rollup"]
+DEFAULT_SIZES = ["10x12x50", "50x12x200", "200x12x500"]
+DATA_VERSION = "2"  # Bump when make_reports writes different reports
+
+
+# "500x12x1000" is 500 cost centers, 12 months and 1000 cost types
+def parse_size(size) -> tuple:
+    n_cost_centers, n_months, n_cost_types = (int(n) for n in size.split("x"))
+    return n_cost_centers, n_months, n_cost_types
+
+
+# Reports are generated once per size and seed and reused by later runs
+def report_dir(size, seed) -> Path:
+    input_dir = DATA_DIR / f"{size}-seed{seed}"
+    complete_path = input_dir / ".complete"
+    if not complete_path.exists() or complete_path.read_text() != DATA_VERSION:
+        shutil.rmtree(input_dir, ignore_errors=True)
+        print(f"Generating reports for {size}")
+        make_reports(input_dir, *parse_size(size), seed=seed)
+        complete_path.write_text(DATA_VERSION)
+    return input_dir
+
+
+# Build the summary, roll up the Cost Center Nodes and save, timed by the
+# RunStats stages of AutoBudget. Saving finishes the run statistics, so the
+# rollup comes before it. memory gives the peak traced allocations of every
+# stage instead of its seconds. Returns them and the AutoBudget.
+def run_stages(input_dir, output_path, options, memory=False) -> tuple:
+    auto_budget.layout_cache.clear()
+    stats = auto_budget.RunStats(trace_memory=memory)
+    budget = auto_budget.AutoBudget(str(input_dir) + "/", stats=stats, **options)
+    budget.make_compilation()
+    if not budget.streaming:  # Streaming keeps no reports to roll up
+        budget.rollup()
+    budget.save(output_path)
+    stages = stats.stages
+
+    # Write-only mode styles every row within compilation, it has no styling
+    key = "peak_traced_mib" if memory else "seconds"
+    results = {stage: stages.get(stage, {}).get(key, 0.0) for stage in STAGES}
+    return results, budget
+
+
+# Check that every node of the rollup totals its children and that the whole
+# organisation totals the months of the summary. Returns a description and
+# whether the check failed.
+def check_rollup(budget, rel_tol) -> tuple:
+    if budget.streaming:
+        return "skipped with streaming", False
+
+    def close(totals, expected):
+        return all(
+            math.isclose(a, b, rel_tol=rel_tol or 1e-9, abs_tol=1e-6)
+            for a, b in zip(totals, expected)
+        )
+
+    tree = budget.rollup()
+    failed = False
+    for path in tree:
+        children = tree.children(path)
+        if children:
+            sums = [tree.total(child) for child in children]
+            expected = (sum(s[0] for s in sums), sum(s[1] for s in sums))
+            failed |= not close(tree.total(path), expected)
+    _, _, actual, planned = budget.budgets.month_totals()
+    failed |= not close(tree.total(), (np.nansum(actual), np.nansum(planned)))
+    description = f"{len(tree)} nodes over {tree.depth()} levels"
+    return description + (", totals do not match" if failed else ""), failed
+
+
+def print_results(size, times, peaks) -> None:
+    print(f"\n{size}")
+    print(f"  {'stage':<12}{'seconds':>10}{'peak MiB':>12}")
+    for stage in STAGES:
+        peak = f"{peaks[stage]:12.1f}" if peaks else f"{'-':>12}"
+        print(f"  {stage:<12}{times[stage]:10.3f}{peak}")
+    peak = f"{max(peaks.values()):12.1f}" if peaks else f"{'-':>12}"
+    print(f"  {'total':<12}{sum(times.values()):10.3f}{peak}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time and memory profile AutoBudget on synthetic reports"
+    )
+    parser.add_argument(
+        "--size",
+        action="append",
+        help="cost centers x months x cost types, e.g. 500x12x1000, can be repeated",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="best of N timings")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--write-only", action="store_true")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument(
+        "--formula-mode", choices=auto_budget.FORMULA_MODES, default="formulas"
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="also run once tracing memory, only the main process is traced",
+    )
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument(
+        "--rel-tol",
+        type=float,
+        default=0,
+        help="allowed relative error of numbers compared to the golden output",
+    )
+    parser.add_argument(
+        "--update-golden",
+        action="store_true",
+        help="save the workbooks as the golden output instead of comparing",
+    )
+    args = parser.parse_args()
+
+    options = {
+        "workers": args.workers,
+        "use_cache": args.cache,
+        "write_only": args.write_only,
+        "streaming": args.streaming,
+        "formula_mode": args.formula_mode,
+    }
+    report = {"options": options, "sizes": {}}
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.size or DEFAULT_SIZES:
+            input_dir = report_dir(size, args.seed)
+            output_path = os.path.join(tmp_dir, f"{size}.xlsx")
+
+            times = None
+            for _ in range(args.repeat):
+                results, budget = run_stages(input_dir, output_path, options)
+                if times is None:
+                    times = results
+                else:
+                    times = {
+                        stage: min(times[stage], results[stage]) for stage in STAGES
+                    }
+
+            peaks = {}
+            if args.memory:
+                peaks, _ = run_stages(input_dir, output_path, options, memory=True)
+            print_results(size, times, peaks)
+
+            # Golden output, compared cell by cell. Hybrid has the same
+            # formulas as the default, only their cached values are new.
+            golden_name = f"{size}-seed{args.seed}"
+            if args.formula_mode == "values":
+                golden_name += "-values"
+            golden_path = GOLDEN_DIR / f"{golden_name}.xlsx"
+            if args.update_golden:
+                GOLDEN_DIR.mkdir(exist_ok=True)
+                shutil.copyfile(output_path, golden_path)
+                golden = "updated"
+            elif golden_path.exists():
+                diffs = compare_workbooks(
+                    golden_path, output_path, rel_tol=args.rel_tol
+                )
+                for diff in diffs:
+                    print(f"  {diff}")
+                golden = "same" if not diffs else "different"
+                failed |= bool(diffs)
+            else:
+                golden = "missing"
+            print(f"  golden output: {golden}")
+
+            rollup, rollup_failed = check_rollup(budget, args.rel_tol)
+            failed |= rollup_failed
+            print(f"  rollup: {rollup}")
+
+            report["sizes"][size] = {
+                "seconds": times,
+                "peak_mib": peaks,
+                "golden": golden,
+                "rollup": rollup,
+            }
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,108 @@
+import argparse
+import math
+import sys
+import openpyxl
+
+
+def side_key(side) -> tuple:
+    if side is None:
+        return (None, None)
+    return (side.style, side.color.rgb if side.color is not None else None)
+
+
+# Everything about a cell that shows up in the summary
+def cell_key(cell) -> tuple:
+    return (
+        cell.value,
+        cell.number_format,
+        cell.font.name,
+        cell.font.size,
+        cell.font.bold,
+        cell.fill.fill_type,
+        cell.fill.fgColor.rgb,
+        side_key(cell.border.left),
+        side_key(cell.border.right),
+        side_key(cell.border.top),
+        side_key(cell.border.bottom),
+        cell.alignment.horizontal,
+    )
+
+
+# Values are equal, numbers within rel_tol of each other
+def same_value(expected, actual, rel_tol) -> bool:
+    if (
+        rel_tol
+        and isinstance(expected, (int, float))
+        and isinstance(actual, (int, float))
+    ):
+        return math.isclose(expected, actual, rel_tol=rel_tol)
+    return expected == actual
+
+
+def column_key(dimension) -> tuple:
+    return (
+        dimension.min,
+        dimension.max,
+        dimension.width,
+        dimension.hidden,
+        dimension.outline_level,
+    )
+
+
+# Differences between two workbooks, cell by cell and column by column,
+# at most max_diffs of them
+def compare_workbooks(expected_path, actual_path, max_diffs=20, rel_tol=0) -> list:
+    expected_wb = openpyxl.load_workbook(expected_path)
+    actual_wb = openpyxl.load_workbook(actual_path)
+    diffs = []
+    if expected_wb.sheetnames != actual_wb.sheetnames:
+        return [f"sheets {expected_wb.sheetnames} != {actual_wb.sheetnames}"]
+
+    for name in expected_wb.sheetnames:
+        expected = expected_wb[name]
+        actual = actual_wb[name]
+        if expected.sheet_properties.outlinePr != actual.sheet_properties.outlinePr:
+            diffs.append(f"{name}: outline properties differ")
+
+        for row in range(1, max(expected.max_row, actual.max_row) + 1):
+            for col in range(1, max(expected.max_column, actual.max_column) + 1):
+                expected_key = cell_key(expected.cell(row, col))
+                actual_key = cell_key(actual.cell(row, col))
+                if expected_key[1:] != actual_key[1:] or not same_value(
+                    expected_key[0], actual_key[0], rel_tol
+                ):
+                    diffs.append(
+                        f"{name}!{expected.cell(row, col).coordinate}: {expected_key} != {actual_key}"
+                    )
+                    if len(diffs) >= max_diffs:
+                        return diffs
+
+        for letter in sorted(
+            set(expected.column_dimensions) | set(actual.column_dimensions)
+        ):
+            expected_key = column_key(expected.column_dimensions[letter])
+            actual_key = column_key(actual.column_dimensions[letter])
+            if expected_key != actual_key:
+                diffs.append(f"{name} column {letter}: {expected_key} != {actual_key}")
+                if len(diffs) >= max_diffs:
+                    return diffs
+    return diffs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare two summary workbooks cell by cell"
+    )
+    parser.add_argument("expected")
+    parser.add_argument("actual")
+    parser.add_argument("--max-diffs", type=int, default=20)
+    parser.add_argument(
+        "--rel-tol", type=float, default=0, help="allowed relative error of numbers"
+    )
+    args = parser.parse_args()
+
+    diffs = compare_workbooks(args.expected, args.actual, args.max_diffs, args.rel_tol)
+    for diff in diffs:
+        print(diff)
+    print("SAME" if not diffs else f"{len(diffs)} differences shown")
+    sys.exit(1 if diffs else 0)
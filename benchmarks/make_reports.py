@@ -0,0 +1,162 @@
+import argparse
+import os
+import random
+import xlwt
+
+# Sheets of an SAP BEx export, only "Cost center report" is read
+SHEET_NAMES = [
+    "BExRepositorySheet",
+    "Cost center report",
+    "Cost center report expand level",
+    "Graph",
+]
+
+# Marker text in column F, the same as auto-budget.py looks for
+PERIOD_MARKER = "Fiscal period / year (Interval, Req.)"
+COST_CENTER_MARKER = "Cost Center Node"
+TABLE_MARKER = "Table"
+END_MARKER = "HSQVBI_CCTR_GR"
+
+
+def cost_type_names(n_cost_types) -> list:
+    return [f"Cost Type {i + 1}" for i in range(n_cost_types)]
+
+
+# Cost centers are the last 4 characters of the node, so past 999 of them
+# they are numbered one apart instead of ten
+def cost_center_names(n_cost_centers) -> list:
+    step = 10 if n_cost_centers <= 999 else 1
+    return [f"{step * (i + 1):04d}" for i in range(n_cost_centers)]
+
+
+# Cost Center Node of a cost center in a made up organisation, departments of
+# 5 cost centers in divisions of 4 departments, like
+# "Company/Division 1/Department 2/CostCenter:0060"
+def cost_center_node(i_center, cost_center) -> str:
+    department = i_center // 5
+    division = department // 4
+    return (
+        f"Company/Division {division + 1}/Department {department + 1}"
+        f"/CostCenter:{cost_center}"
+    )
+
+
+# Write one report in the "Cost center report" layout. costs is a list of
+# (cost_type, actual, planned), None for an empty cell. node is the Cost
+# Center Node, by default only the cost center.
+def write_report(file_path, cost_date, cost_center, costs, node=None) -> None:
+    wb = xlwt.Workbook()
+    sheets = {name: wb.add_sheet(name) for name in SHEET_NAMES}
+    sheet = sheets["Cost center report"]
+
+    # Header
+    sheet.write(4, 5, "Information")
+    sheet.write(5, 5, "Query Description")
+    sheet.write(5, 6, "Cost Center Report")
+    sheet.write(6, 5, PERIOD_MARKER)
+    sheet.write(6, 6, cost_date)
+    sheet.write(7, 5, COST_CENTER_MARKER)
+    sheet.write(7, 6, node or f"CostCenter:{cost_center}")
+
+    # Table header
+    sheet.write(13, 2, "Filter")
+    sheet.write(13, 5, TABLE_MARKER)
+    sheet.write(14, 2, "Cost Element")
+    sheet.write(14, 7, "Actual")
+    sheet.write(14, 8, "Planned")
+    sheet.write(15, 2, "Fiscal year/period")
+    sheet.write(15, 5, "Cost Element")
+    sheet.write(15, 7, "* 1.000 SEK")
+    sheet.write(15, 8, "* 1.000 SEK")
+
+    # Cost types
+    row = 16
+    sheet.write(row, 2, "Key Figures")
+    sheet.write(row + 1, 2, "Version")
+    total_actual = 0
+    total_planned = 0
+    for cost_type, actual, planned in costs:
+        sheet.write(row, 4, " ")
+        sheet.write(row, 6, cost_type)
+        if actual is not None:
+            sheet.write(row, 7, actual)
+            total_actual += actual
+        if planned is not None:
+            sheet.write(row, 8, planned)
+            total_planned += planned
+        row += 1
+
+    # End of table and the padding SAP leaves below it
+    sheet.write(row, 4, " ")
+    sheet.write(row, 5, END_MARKER)
+    sheet.write(row, 6, "Cost Center Group for BI")
+    sheet.write(row, 7, round(total_actual, 5))
+    sheet.write(row, 8, round(total_planned, 5))
+    for padding_row in range(row + 1, row + 7):
+        sheet.write(padding_row, 4, " ")
+
+    wb.save(file_path)
+
+
+def random_cost(rng, scale) -> float:
+    if rng.random() < 0.1:
+        return float(rng.randint(-50, 50))
+    return round(rng.uniform(-0.2, 1) * scale, 5)
+
+
+# Costs of one report: most cost types, some with no actual cost yet
+def make_costs(rng, cost_types, coverage=0.9, empty_actual=0.15) -> list:
+    costs = []
+    for cost_type in cost_types:
+        if rng.random() > coverage:
+            continue
+        scale = rng.choice([10, 100, 1000, 20000])
+        actual = None if rng.random() < empty_actual else random_cost(rng, scale)
+        costs.append((cost_type, actual, random_cost(rng, scale)))
+    return costs
+
+
+# Write n_cost_centers * n_months reports to output_dir, the same seed always
+# gives the same files
+def make_reports(
+    output_dir, n_cost_centers, n_months, n_cost_types, year="2021", seed=0
+) -> list:
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    cost_types = cost_type_names(n_cost_types)
+    file_paths = []
+    for i_center, cost_center in enumerate(cost_center_names(n_cost_centers)):
+        for month in range(1, n_months + 1):
+            file_path = os.path.join(output_dir, f"{cost_center}_{month:03d}.XLS")
+            write_report(
+                file_path,
+                f"{month:03d}.{year}",
+                cost_center,
+                make_costs(rng, cost_types),
+                cost_center_node(i_center, cost_center),
+            )
+            file_paths.append(file_path)
+    return file_paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write synthetic SAP cost center reports"
+    )
+    parser.add_argument("output_dir")
+    parser.add_argument("--cost-centers", type=int, default=10)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--cost-types", type=int, default=50)
+    parser.add_argument("--year", default="2021")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    file_paths = make_reports(
+        args.output_dir,
+        args.cost_centers,
+        args.months,
+        args.cost_types,
+        args.year,
+        args.seed,
+    )
+    print(f"Wrote {len(file_paths)} reports to {args.output_dir}")